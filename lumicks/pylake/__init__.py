@@ -2,6 +2,13 @@ from .__about__ import (__author__, __copyright__, __doc__, __email__, __license
                         __title__, __url__, __version__)
 
 from .file import *
+from .collection import FileCollection
+from . import batch
+from .channel import align, psd
+from .events import find_events
+from .detail.cache import set_cache_size
+from .detail.dtypes import set_default_dtypes
+from .detail.handles import set_max_open_files, open_files_info
 from .correlated_stack import CorrelatedStack
 
 
@@ -0,0 +1,133 @@
+"""Apply a function to many Bluelake files in parallel processes"""
+import collections
+import concurrent.futures
+import os
+import pickle
+import traceback
+
+from .file import File
+
+__all__ = ["map", "Result"]
+
+Result = collections.namedtuple("Result", ["path", "value", "error", "traceback"])
+Result.__doc__ = """The outcome of a function applied to one file: its `value` or the `error`
+
+`error` is `None` if the function succeeded. Otherwise, `value` is `None` and `traceback`
+describes where the error was raised (in the worker process).
+"""
+
+
+def _picklable(error):
+    """`error` itself if it can be sent back from a worker, or else a stand-in"""
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _apply(func, paths, file_kwargs):
+    """Open each file, apply `func` and close the file again, catching errors per file"""
+    results = []
+    for path in paths:
+        try:
+            with File(path, **file_kwargs) as file:
+                results.append(Result(path, func(file), None, None))
+        except Exception as error:
+            results.append(Result(path, None, _picklable(error), traceback.format_exc()))
+    return results
+
+
+def map(func, paths, workers=None, chunksize=1, ordered=True, **kwargs):
+    """Apply `func` to each of the Bluelake files in `paths` using a pool of worker processes
+
+    Files are opened inside the workers, so `func` receives a `File` without anything being
+    pickled except for the function, the paths and the results. Each worker opens a single file
+    at a time and closes it before the next, so at most `workers` files are open at once, and at
+    most two chunks per worker are queued, which bounds the memory taken up by results which
+    are waiting to be yielded.
+
+    Parameters
+    ----------
+    func : callable
+        Called with each `File`. It must be picklable, i.e. defined at the top level of a
+        module, and so must its return value.
+    paths : Iterable[str]
+        The files to process.
+    workers : Optional[int]
+        The number of worker processes. Defaults to the number of CPUs. 0 processes the files
+        one by one in this process, e.g. for debugging.
+    chunksize : int
+        The number of files which are sent to a worker at once. Larger chunks have less
+        overhead for quick functions.
+    ordered : bool
+        Yield results in the order of `paths` or, if `False`, as soon as they're done.
+    **kwargs
+        Forwarded to `File`, e.g. `dtypes`.
+
+    Yields
+    ------
+    Result
+        The `path`, and the `value` returned by `func` or the `error` which it raised.
+        Errors of one file don't affect the others.
+
+    Examples
+    --------
+    ::
+
+        import glob
+        from lumicks import pylake
+
+        def mean_force(file):
+            return file.force1x.mean()
+
+        for result in pylake.batch.map(mean_force, glob.glob("*.h5"), workers=8):
+            if result.error:
+                print(f"{result.path} failed: {result.error}")
+            else:
+                print(result.path, result.value)
+    """
+    if chunksize < 1:
+        raise ValueError("The chunk size must be at least 1")
+    paths = [str(path) for path in paths]
+    chunks = [paths[i:i + chunksize] for i in range(0, len(paths), chunksize)]
+
+    if workers == 0:
+        for chunk in chunks:
+            yield from _apply(func, chunk, kwargs)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        remaining = iter(chunks)
+        pending = collections.deque()  # in order of submission
+
+        def submit():
+            chunk = next(remaining, None)
+            if chunk is None:
+                return
+            try:
+                future = executor.submit(_apply, func, chunk, kwargs)
+            except concurrent.futures.process.BrokenProcessPool as error:
+                future = concurrent.futures.Future()  # report it for each file in the chunk
+                future.set_exception(error)
+            pending.append((chunk, future))
+
+        for _ in range(2 * workers):
+            submit()
+
+        while pending:
+            if ordered:
+                chunk, future = pending.popleft()
+            else:
+                done = concurrent.futures.wait([f for _, f in pending],
+                                               return_when=concurrent.futures.FIRST_COMPLETED)
+                chunk, future = next((c, f) for c, f in pending if f in done.done)
+                pending.remove((chunk, future))
+
+            try:
+                results = future.result()
+            except Exception as error:  # e.g. a worker which crashed or an unpicklable result
+                results = [Result(path, None, error, traceback.format_exc()) for path in chunk]
+            submit()
+            yield from results
@@ -1,8 +1,17 @@
+import bisect
 import math
 import numpy as np
 
-from .detail.timeindex import to_timestamp
+from .detail.dataset import DatasetView
+from .detail.decimation import MinMaxPyramid
+from .detail.dtypes import cast, reduce_precise
+from .detail.ranges import has_kernel, reduce_ranges
+from .detail.rolling import has_rolling_kernel, rolling
+from .detail.statistics import QuantileSketch, RunningMoments
+from .detail.timeindex import AffineTimestamps, Timeindex, to_timestamp
+from .detail.utilities import import_pyarrow
 from .calibration import ForceCalibration
+from .power_spectrum import WelchAverage
 
 
 class Slice:
@@ -25,6 +34,8 @@ class Slice:
         self._src = data_source
         self.labels = labels or {}
         self._calibration = calibration
+        self._moments = None
+        self._sketch = None
 
     def __len__(self):
         return len(self._src)
@@ -48,6 +59,60 @@ class Slice:
 
         return self._with_data_source(self._src.slice(start, stop))
 
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        """Element-wise functions of slices, e.g. `np.sqrt(slice)`, return lazy slices
+
+        The operands may be scalars or other slices with the same timestamps. The result is
+        only computed, one chunk at a time, once its data is accessed.
+        """
+        if method != "__call__" or kwargs or ufunc.nout != 1:
+            return NotImplemented
+        if not all(isinstance(x, Slice) or np.ndim(x) == 0 for x in inputs):
+            return NotImplemented
+
+        slices = [x for x in inputs if isinstance(x, Slice)]
+        labels = {k: v for k, v in slices[0].labels.items() if k != "title"}
+        if all(len(x) == 0 for x in slices):
+            return Slice(Empty(), labels)
+        operands = [x._src if isinstance(x, Slice) else x for x in inputs]
+        return Slice(Expression(ufunc, operands), labels)
+
+    def __add__(self, other):
+        return np.add(self, other)
+
+    def __radd__(self, other):
+        return np.add(other, self)
+
+    def __sub__(self, other):
+        return np.subtract(self, other)
+
+    def __rsub__(self, other):
+        return np.subtract(other, self)
+
+    def __mul__(self, other):
+        return np.multiply(self, other)
+
+    def __rmul__(self, other):
+        return np.multiply(other, self)
+
+    def __truediv__(self, other):
+        return np.true_divide(self, other)
+
+    def __rtruediv__(self, other):
+        return np.true_divide(other, self)
+
+    def __pow__(self, other):
+        return np.power(self, other)
+
+    def __rpow__(self, other):
+        return np.power(other, self)
+
+    def __neg__(self):
+        return np.negative(self)
+
+    def __abs__(self):
+        return np.absolute(self)
+
     def _with_data_source(self, data_source):
         """Return a copy of this slice with a different data source, but keep other properties"""
         return self.__class__(data_source, self.labels, self._calibration)
@@ -60,7 +125,7 @@ class Slice:
     @property
     def timestamps(self):
         """Absolute timestamps (since epoch) which correspond to the channel data"""
-        return self._src.timestamps
+        return np.asarray(self._src.timestamps)
 
     @property
     def calibration(self) -> list:
@@ -89,13 +154,14 @@ class Slice:
 
         Parameters
         ----------
-        range_list : list of tuples
-            A list of (start, stop) tuples indicating over which ranges to apply the function.
-            Start and stop have to be specified in nanoseconds.
+        range_list : list of tuples or np.ndarray
+            A list of (start, stop) tuples or an `(N, 2)` array indicating over which ranges to
+            apply the function. Start and stop have to be specified in nanoseconds.
         reduce : callable
             The `numpy` function which is going to reduce multiple samples into one.
             The default is `np.mean`, but `np.sum` could also be appropriate for some
-            cases, e.g. photon counts.
+            cases, e.g. photon counts. `np.mean`, `np.sum`, `np.std`, `np.min` and `np.max`
+            are evaluated for all ranges at once. Other functions are called for each range.
         where : str
             Where to put the final time point.
             'center' time point is put at start + stop / 2
@@ -111,26 +177,68 @@ class Slice:
             stack = pylake.CorrelatedStack("example.tiff")
             file.force1x.downsampled_over(stack.timestamps)
         """
-        if not isinstance(range_list, list):
+        if isinstance(range_list, (list, np.ndarray)):
+            ranges = np.asarray(range_list)
+        else:
             raise TypeError("Did not pass timestamps to range_list.")
 
-        assert len(range_list[0]) == 2, "Did not pass timestamps to range_list."
-        assert self._src.start < range_list[-1][1], "No overlap between CorrelatedStack and selected channel."
-        assert self._src.stop > range_list[0][0], "No overlap between CorrelatedStack and selected channel"
+        assert ranges.ndim == 2 and ranges.shape[1] == 2, "Did not pass timestamps to range_list."
+        assert self._src.start < ranges[-1, 1], "No overlap between CorrelatedStack and selected channel."
+        assert self._src.stop > ranges[0, 0], "No overlap between CorrelatedStack and selected channel"
 
         if where != 'center' and where != 'left':
             raise ValueError("Invalid argument for where. Valid options are center and left")
 
-        t = np.zeros(len(range_list))
-        d = np.zeros(len(range_list))
-        for i, time_range in enumerate(range_list):
-            start, stop = time_range
-            subset = self[start:stop]
-            t[i] = (start + stop) // 2 if where == 'center' else start
-            d[i] = reduce(subset.data)
+        starts, stops = ranges[:, 0], ranges[:, 1]
+        t = (starts + stops) // 2 if where == 'center' else starts.copy()
 
+        d = self.slices(ranges).reduce(reduce)
         return Slice(TimeSeries(d, t), self.labels)
 
+    def slices(self, ranges):
+        """Slice this channel by many time ranges at once
+
+        This is much faster than slicing in a loop when there are many ranges, e.g. one per frame
+        of a correlated stack or one per kymograph line. The index bounds of all ranges are
+        found in one go and the data covered by the ranges is read only once.
+
+        Parameters
+        ----------
+        ranges : array_like
+            An `(N, 2)` array or a list of `(start, stop)` timestamps in nanoseconds.
+
+        Returns
+        -------
+        SliceCollection
+
+        Examples
+        --------
+        ::
+
+            from lumicks import pylake
+
+            file = pylake.File("example.h5")
+            stack = pylake.CorrelatedStack("example.tiff")
+            frames = file.force1x.slices(stack.timestamps)
+            mean_force, max_force = frames.reduce(np.mean), frames.reduce(np.max)
+        """
+        ranges = np.asarray(ranges, dtype=np.int64).reshape(-1, 2)
+        if ranges.size == 0:
+            return SliceCollection(self, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+        # Only the data covered by the ranges needs to be read
+        covered = self[ranges[:, 0].min():ranges[:, 1].max()]
+        src = covered._src
+        if len(src) == 0:
+            return SliceCollection(covered, *np.zeros((2, len(ranges)), dtype=np.int64))
+        if not getattr(src, "is_sorted", False):
+            order = np.argsort(src.timestamps, kind="stable")
+            src = TimeSeries(src.data[order], np.asarray(src.timestamps)[order])
+            src._sorted = True
+
+        starts, stops = src.searchsorted(ranges.T)
+        return SliceCollection(covered._with_data_source(src), starts, np.maximum(starts, stops))
+
     def downsampled_by(self, factor, reduce=np.mean):
         """Return a copy of this slice which is downsampled by `factor`
 
@@ -145,6 +253,356 @@ class Slice:
         """
         return self._with_data_source(self._src.downsampled_by(factor, reduce))
 
+    def downsampled_to(self, frequency, reduce=np.mean, where='center'):
+        """Return a copy of this slice which is downsampled to fixed time windows of
+        `1 / frequency`
+
+        Unlike `downsampled_by()`, this also works for channels with irregular timestamps such as
+        `downsampled_force1` and `distance1`. Windows start at multiples of their length since
+        the timestamp epoch, so all channels which are downsampled to the same frequency share
+        their timestamps, even if they start at different times. Windows without any samples are
+        dropped, so the result is a time series.
+
+        Parameters
+        ----------
+        frequency : float
+            The target sample rate (Hz), i.e. the inverse of the window length.
+        reduce : callable
+            The `numpy` function which is going to reduce multiple samples into one.
+            The default is `np.mean`, but `np.sum` could also be appropriate for some
+            cases, e.g. photon counts. `np.mean`, `np.sum`, `np.std`, `np.min` and `np.max`
+            are evaluated for all windows at once. Other functions are called for each window.
+        where : str
+            Where to put the final time point.
+            'center' time point is put at the center of the window
+            'left' time point is put at the start of the window
+
+        Examples
+        --------
+        ::
+
+            from lumicks import pylake
+
+            file = pylake.File("example.h5")
+            file.downsampled_force1x.downsampled_to(10)  # 10 Hz
+        """
+        if where != 'center' and where != 'left':
+            raise ValueError("Invalid argument for where. Valid options are center and left")
+
+        window = int(1e9 / frequency)
+        if window <= 0:
+            raise ValueError("The frequency must be positive and below 1 GHz")
+
+        if len(self) == 0:
+            return self._with_data_source(TimeSeries(np.empty(0), np.empty(0, dtype=np.int64)))
+
+        timestamps, data = self.timestamps, self.data
+        if not getattr(self._src, "is_sorted", False):
+            order = np.argsort(timestamps, kind="stable")
+            timestamps, data = timestamps[order], data[order]
+
+        # Consecutive samples with the same window id form one (non-empty) window
+        window_ids = np.asarray(timestamps, dtype=np.int64) // window
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(window_ids)) + 1))
+        stops = np.append(starts[1:], len(data))
+
+        if has_kernel(reduce):
+            d = reduce_ranges(data, starts, stops, reduce)
+        else:
+            d = np.array([reduce(data[start:stop]) for start, stop in zip(starts, stops)],
+                         dtype=float)
+        t = window_ids[starts] * window + (window // 2 if where == 'center' else 0)
+
+        return self._with_data_source(TimeSeries(d, t))
+
+    def binned(self, bin_width):
+        """Return a continuous channel which counts the time tags in consecutive time bins
+
+        Only available for time tag channels, e.g. photon time tags. The time tags are
+        streamed in chunks, so memory use depends on the number of bins, not time tags.
+
+        Parameters
+        ----------
+        bin_width : Union[int, str]
+            The width of each bin in nanoseconds or as a time string, e.g. "1ms".
+            The timestamp of each bin is the start of the bin.
+
+        Examples
+        --------
+        ::
+
+            from lumicks import pylake
+
+            file = pylake.File("example.h5")
+            red_counts = file.red_photon_time_tags.binned("100us")
+        """
+        if isinstance(bin_width, str):
+            bin_width = Timeindex(bin_width).total_ns
+        if bin_width <= 0:
+            raise ValueError("The bin width must be positive")
+
+        try:
+            binned = self._src.binned
+        except AttributeError:
+            raise NotImplementedError("Binning is only available for time tag data")
+        return self._with_data_source(binned(bin_width))
+
+    def resampled_to(self, target, method="linear"):
+        """Return a copy of this slice which is resampled at the timestamps of `target`
+
+        Samples are looked up using a binary search and interpolated in chunks of the target
+        timestamps, so only the part of this channel which covers each chunk is read at a time.
+        Targets before the first or after the last sample of this slice become `nan`.
+
+        Parameters
+        ----------
+        target : Union[Slice, array_like]
+            A slice whose timestamps should be used or the timestamps themselves (in ns).
+        method : str
+            'linear' interpolates between the neighbouring samples
+            'nearest' takes the sample which is closest in time
+            'previous' takes the last sample at or before each target timestamp
+
+        Examples
+        --------
+        ::
+
+            from lumicks import pylake
+
+            file = pylake.File("example.h5")
+            distance = file.distance1.resampled_to(file.force1x)  # on the 78 kHz force time grid
+        """
+        return align([self], target, method)[0]
+
+    def psd(self, segment_length, window="hann", overlap=None):
+        """Estimate the power spectral density using Welch's method
+
+        The data is streamed from disk in chunks and the segments of each chunk are averaged
+        right away, so long recordings don't need to fit in memory. Only available for
+        continuous channels, e.g. the high frequency force. See :func:`psd` to compute the
+        spectra of several channels in a single pass.
+
+        Parameters
+        ----------
+        segment_length : Union[int, str]
+            The length of the segments which are averaged in samples or as a time string, e.g.
+            "1s". This determines the frequency resolution.
+        window : Union[str, tuple, np.ndarray]
+            Window name or parameters, see :func:`scipy.signal.get_window`, or the window itself.
+        overlap : Optional[Union[int, str]]
+            The overlap between consecutive segments in samples or as a time string. Defaults
+            to half a segment.
+
+        Returns
+        -------
+        PowerSpectrum
+
+        Examples
+        --------
+        ::
+
+            from lumicks import pylake
+
+            file = pylake.File("example.h5")
+            spectrum = file.force1x["0s":"60s"].psd("1s")
+            spectrum.plot()
+        """
+        return psd([self], segment_length, window, overlap)[0]
+
+    def rolling(self, window, reduce=np.mean):
+        """Return a lazily evaluated slice of a reduction of a sliding window around each sample
+
+        The window of sample `i` covers the samples `i - window // 2` up to (but excluding)
+        `i - window // 2 + window`. Windows are cut off at the edges of the channel. The result is
+        computed in chunks once its data is accessed, and slicing it only computes the selected
+        samples.
+
+        Parameters
+        ----------
+        window : Union[int, str]
+            The number of samples per window or, for continuous channels, the window length as a
+            time string, e.g. "10ms".
+        reduce : callable
+            `np.mean` (the default), `np.sum`, `np.median`, `np.min` or `np.max`. The mean and
+            the sum take constant time per sample regardless of the window length.
+
+        Examples
+        --------
+        ::
+
+            from lumicks import pylake
+
+            file = pylake.File("example.h5")
+            smooth = file.force1x.rolling("10ms")
+            smooth_median = file.force1x.rolling(101, reduce=np.median)
+        """
+        if isinstance(window, str):
+            if not self.sample_rate:
+                raise ValueError("Window lengths can only be given as time for continuous "
+                                 "channels. Use a number of samples instead.")
+            window = int(round(Timeindex(window).total_ns * self.sample_rate / 1e9))
+        if window < 1:
+            raise ValueError("The window must contain at least one sample")
+        if not has_rolling_kernel(reduce):
+            raise ValueError("Invalid argument for reduce. Valid options are np.mean, np.sum, "
+                             "np.median, np.min and np.max")
+
+        if len(self) == 0:
+            return self
+        return self._with_data_source(Rolling(self._src, window, reduce))
+
+    def to_arrow(self):
+        """Convert to a `pyarrow.Table` with an int64 "timestamp" and a "value" column
+
+        The channel is streamed in chunks which become the record batches of the table, so it's
+        never loaded twice. The numeric columns share memory with the data of each chunk. Time
+        tags are their own timestamps, so they only have the "timestamp" column. Requires the
+        optional `pyarrow` package.
+
+        Examples
+        --------
+        ::
+
+            from lumicks import pylake
+
+            file = pylake.File("example.h5")
+            df = file.force1x["0s":"1s"].to_arrow().to_pandas()
+        """
+        pa = import_pyarrow()
+
+        names = [None if isinstance(self._src, TimeTags) else "value"]
+        batches = list(_record_batches([self], names, n_samples=_stream_chunk_size))
+        if not batches:
+            columns = {"timestamp": np.empty(0, dtype=np.int64)}
+            if names[0]:
+                columns["value"] = np.asarray(self.data)
+            return pa.table(columns)
+        return pa.Table.from_batches(batches)
+
+    def iter_chunks(self, n_samples=None, duration=None, overlap=0):
+        """Iterate over consecutive chunks of this slice
+
+        The chunks are slices themselves which are only read once their data is accessed.
+        Iterating and processing one chunk at a time makes it possible to analyze channels
+        which are too large to load into memory at once.
+
+        Parameters
+        ----------
+        n_samples : Optional[int]
+            The number of samples per chunk. For HDF5 channels, this is rounded up to a multiple
+            of the dataset's chunk size so that every read is aligned to the file layout.
+        duration : Optional[Union[int, str]]
+            Alternatively, the duration of each chunk in nanoseconds or as a time string.
+        overlap : Union[int, str]
+            Consecutive chunks share this many samples (when chunking by `n_samples`) or this
+            much time (when chunking by `duration`). The default is no overlap.
+
+        Examples
+        --------
+        ::
+
+            from lumicks import pylake
+
+            file = pylake.File("example.h5")
+            maxima = [chunk.data.max() for chunk in file.force1x.iter_chunks(duration="10s")]
+        """
+        if (n_samples is None) == (duration is None):
+            raise ValueError("Either `n_samples` or `duration` must be specified")
+        if len(self) == 0:
+            return
+
+        if duration is not None:
+            duration, overlap = (Timeindex(v).total_ns if isinstance(v, str) else v
+                                 for v in (duration, overlap))
+            if not 0 <= overlap < duration:
+                raise ValueError("The overlap must be non-negative and shorter than a chunk")
+            streamed = self._with_data_source(_streamed(self._src))
+            start, stop = self._src.start, self._src.stop
+            while start < stop:
+                yield streamed[start:start + duration]
+                start += duration - overlap
+        else:
+            if not 0 <= overlap < n_samples:
+                raise ValueError("The overlap must be non-negative and smaller than a chunk")
+            starts, stops = _chunk_bounds(len(self), n_samples, overlap,
+                                          *_storage_layout(self._src))
+            src = _streamed(self._src)
+            for start, stop in zip(starts, stops):
+                yield self._with_data_source(src.index_slice(start, stop))
+
+    def _stream_chunks(self):
+        """Chunks of data for the single-pass reductions below"""
+        for chunk in self.iter_chunks(n_samples=_stream_chunk_size):
+            yield chunk.data
+
+    def _running_moments(self):
+        if self._moments is None:
+            moments = RunningMoments()
+            for data in self._stream_chunks():
+                moments.update(data)
+            self._moments = moments
+        return self._moments
+
+    def count(self):
+        """The number of samples in this slice"""
+        return self._running_moments().count
+
+    def sum(self):
+        """The sum of the data, accumulated in double precision"""
+        return self._running_moments().sum
+
+    def mean(self):
+        """The mean of the data or `nan` if the slice is empty
+
+        Like the other reductions of a slice, this is computed in a single pass over chunks of
+        the data, so it's never loaded into memory all at once. The moments and extrema are
+        computed together and cached: e.g. `mean()` followed by `std()` only reads the data once.
+        """
+        return self._running_moments().mean
+
+    def var(self, ddof=0):
+        """The variance of the data, see :func:`numpy.var` for the meaning of `ddof`"""
+        return self._running_moments().var(ddof)
+
+    def std(self, ddof=0):
+        """The standard deviation of the data, see :func:`numpy.std` for the meaning of `ddof`"""
+        return np.sqrt(self.var(ddof))
+
+    def min(self):
+        """The minimum of the data or `nan` if the slice is empty"""
+        return self._running_moments().min
+
+    def max(self):
+        """The maximum of the data or `nan` if the slice is empty"""
+        return self._running_moments().max
+
+    def quantile(self, q):
+        """Approximate quantile(s) of the data
+
+        The data is streamed through a mergeable quantile sketch which uses a fixed amount of
+        memory, regardless of the length of the slice. Slices of up to 200 samples
+        give exact results. For longer slices, the rank of the result is typically within 1% of
+        the requested one. Use `np.quantile(slice.data, q)` when exact results are required.
+
+        Parameters
+        ----------
+        q : array_like of float
+            Quantile(s) to compute, in the range [0, 1].
+        """
+        if self._sketch is None:
+            sketch = QuantileSketch()
+            for data in self._stream_chunks():
+                sketch.update(data)
+            self._sketch = sketch
+        return self._sketch.quantile(q)
+
+    def percentile(self, q):
+        """Approximate percentile(s) of the data, with `q` in the range [0, 100]
+
+        See :meth:`quantile` for details.
+        """
+        return self.quantile(np.asarray(q) / 100)
+
     def plot(self, **kwargs):
         """A simple line plot to visualize the data over time
 
@@ -155,12 +613,115 @@ class Slice:
         """
         import matplotlib.pyplot as plt
 
-        seconds = (self.timestamps - self.timestamps[0]) / 1e9
-        plt.plot(seconds, self.data, **kwargs)
+        # Long continuous channels are drawn as their min/max envelope at about the resolution
+        # of the axes. The envelope is updated when zooming in.
+        num_bins = max(int(plt.gca().bbox.width), 1)
+        if isinstance(self._src, Continuous) and len(self) > 4 * num_bins:
+            self._plot_envelope(num_bins, **kwargs)
+        else:
+            timestamps = self._src.timestamps  # not materialized for continuous data
+            seconds = (timestamps - timestamps[0]) / 1e9
+            plt.plot(seconds, self.data, **kwargs)
         plt.xlabel(self.labels.get("x", "Time") + " (s)")
         plt.ylabel(self.labels.get("y", "y"))
         plt.title(self.labels.get("title", "title"))
 
+    def _plot_envelope(self, num_bins, **kwargs):
+        import matplotlib.pyplot as plt
+
+        src = self._src
+        seconds_per_sample = src.dt / 1e9
+
+        def envelope(start_idx, stop_idx):
+            """Vertical min-max segments joined into a single line"""
+            centers, minima, maxima = src.envelope(start_idx, stop_idx, num_bins)
+            return np.repeat(centers * seconds_per_sample, 2), np.stack((minima, maxima), 1).ravel()
+
+        line, = plt.plot(*envelope(0, len(src)), **kwargs)
+
+        def update_envelope(axes):
+            first, last = axes.get_xlim()
+            line.set_data(*envelope(int(first / seconds_per_sample) - 1,
+                                    int(np.ceil(last / seconds_per_sample)) + 1))
+
+        line.axes.callbacks.connect("xlim_changed", update_envelope)
+
+
+_stream_chunk_size = 2**20
+_expression_chunk_size = 2**16  # small enough for the intermediates to stay in the CPU cache
+
+
+class SliceCollection:
+    """Many slices of one channel, e.g. the parts of a force channel during each frame of a stack
+
+    Users get these from `Slice.slices()`. The data of all slices is read into one shared buffer
+    when it's first needed, and each slice is a view into it.
+
+    Parameters
+    ----------
+    parent : Slice
+        A slice which covers all of the slices in this collection.
+    starts, stops : np.ndarray
+        The index ranges of the slices within `parent`.
+    """
+    def __init__(self, parent, starts, stops):
+        self._parent = parent
+        self.starts = starts
+        self.stops = stops
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.__class__(self._parent, self.starts[item], self.stops[item])
+        src = self._parent._src
+        if len(src) == 0:
+            return self._parent
+        return self._parent._with_data_source(src.index_slice(self.starts[item],
+                                                              self.stops[item]))
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def counts(self):
+        """The number of samples in each slice"""
+        return self.stops - self.starts
+
+    @property
+    def data(self):
+        """List of the data of each slice"""
+        data = self._parent.data
+        return [data[start:stop] for start, stop in zip(self.starts, self.stops)]
+
+    @property
+    def timestamps(self):
+        """List of the timestamps of each slice"""
+        timestamps = self._parent.timestamps
+        return [timestamps[start:stop] for start, stop in zip(self.starts, self.stops)]
+
+    def reduce(self, reduce=np.mean):
+        """Reduce the data of each slice to a single value
+
+        Parameters
+        ----------
+        reduce : callable
+            The `numpy` function which is going to reduce the samples of a slice.
+            `np.mean`, `np.sum`, `np.std`, `np.min` and `np.max` are evaluated for all slices at
+            once. Other functions are called for each slice.
+
+        Returns
+        -------
+        np.ndarray
+            The reduction of each slice as a `float64`. Empty slices sum to zero and are `nan`
+            for the vectorized reductions.
+        """
+        if has_kernel(reduce):
+            return reduce_ranges(self._parent.data, self.starts, self.stops, reduce)
+        else:
+            return np.array([reduce(d) for d in self.data], dtype=float)
+
 
 def _downsample(data, factor, reduce):
     def round_down(size, n):
@@ -168,7 +729,215 @@ def _downsample(data, factor, reduce):
         return int(math.floor(size / n)) * n
 
     data = data[:round_down(data.size, factor)]
-    return reduce(data.reshape(-1, factor), axis=1)
+    return reduce_precise(reduce, data.reshape(-1, factor), axis=1)
+
+
+def _storage_layout(source):
+    """The offset of `source` within its HDF5 dataset and the dataset's chunk size
+
+    Returns `(0, 1)`, i.e. no particular alignment, for sources which aren't read from HDF5.
+    """
+    data = getattr(source, "_src_data", None)
+    if isinstance(data, DatasetView) and data.chunk_size:
+        return data.start, data.chunk_size
+    else:
+        return 0, 1
+
+
+def _chunk_bounds(size, n_samples, overlap, offset=0, alignment=1):
+    """Index bounds of chunks of `n_samples` which overlap by `overlap` samples
+
+    All but the first chunk start at multiples of `alignment` relative to `-offset`.
+    """
+    step = n_samples - overlap
+    step = -(-step // alignment) * alignment
+    first = (offset + step) // alignment * alignment - offset
+    starts = np.concatenate(([0], np.arange(first, size, step, dtype=np.int64)))
+    stops = np.minimum(np.append(starts[1:] + overlap, size), size)
+    return starts, stops
+
+
+def _resample(timestamps, data, target, method):
+    """Resample `data` with sorted `timestamps` at `target` timestamps, or `nan` when outside"""
+    result = np.full(target.shape, np.nan)
+    if timestamps.size == 0:
+        return result
+
+    inside = np.logical_and(target >= timestamps[0], target <= timestamps[-1])
+    t = target[inside]
+    if method == "linear":
+        # Interpolate relative to the first timestamp: absolute ones don't fit in a double
+        result[inside] = np.interp(t - timestamps[0], timestamps - timestamps[0], data)
+    else:
+        after = np.searchsorted(timestamps, t, side="right")
+        index = after - 1
+        if method == "nearest":
+            after = np.minimum(after, timestamps.size - 1)
+            index = np.where(t - timestamps[index] <= timestamps[after] - t, index, after)
+        result[inside] = data[index]
+    return result
+
+
+def align(slices, target, method="linear"):
+    """Resample several slices at the same timestamps in one pass, see `Slice.resampled_to()`
+
+    The target timestamps are processed in chunks. For each chunk, all slices are resampled
+    before moving on to the next one, which reads every slice only once.
+
+    Parameters
+    ----------
+    slices : List[Slice]
+    target : Union[Slice, array_like]
+        A slice whose timestamps should be used or the timestamps themselves (in ns).
+    method : str
+        'linear', 'nearest' or 'previous'
+
+    Returns
+    -------
+    List[Slice]
+        The resampled slices. They're continuous if `target` is a continuous slice.
+    """
+    if method not in ("linear", "nearest", "previous"):
+        raise ValueError("Invalid argument for method. Valid options are linear, nearest and "
+                         "previous")
+
+    timestamps = target._src.timestamps if isinstance(target, Slice) else \
+        np.asarray(target, dtype=np.int64)
+
+    sources = []
+    for src in (s._src for s in slices):
+        if len(src) > 0 and not getattr(src, "is_sorted", False):
+            order = np.argsort(src.timestamps, kind="stable")
+            src = TimeSeries(src.data[order], np.asarray(src.timestamps)[order])
+            src._sorted = True
+        sources.append(_streamed(src))
+
+    resampled = [np.empty(len(timestamps)) for _ in sources]
+    for first in range(0, len(timestamps), _stream_chunk_size):
+        t = np.asarray(timestamps[first:first + _stream_chunk_size])
+        for src, out in zip(sources, resampled):
+            if len(src) == 0:
+                out[first:first + t.size] = np.nan
+                continue
+
+            # Only read the samples which cover this chunk, including the neighbours at the edges
+            lo, hi = src.searchsorted([t.min(), t.max()])
+            covering = src.index_slice(max(lo - 1, 0), min(hi + 1, len(src)))
+            out[first:first + t.size] = _resample(np.asarray(covering.timestamps),
+                                                  np.asarray(covering.data), t, method)
+
+    def make(data):
+        if isinstance(timestamps, AffineTimestamps):
+            return Continuous(data, timestamps.start, timestamps.dt)
+        else:
+            return TimeSeries(data, timestamps)
+
+    return [s._with_data_source(make(data)) for s, data in zip(slices, resampled)]
+
+
+def _side_by_side_chunks(slices, n_samples):
+    """Chunks of the same index ranges of slices with the same length, like `iter_chunks()`
+
+    The chunks are aligned to the HDF5 chunks of the first slice. The other slices may have a
+    different layout, so they're chunked by the same bounds rather than their own.
+    """
+    starts, stops = _chunk_bounds(len(slices[0]), n_samples, 0, *_storage_layout(slices[0]._src))
+    sources = [_streamed(s._src) for s in slices]
+    for start, stop in zip(starts, stops):
+        yield [s._with_data_source(src.index_slice(start, stop)) for s, src in zip(slices, sources)]
+
+
+def psd(slices, segment_length, window="hann", overlap=None):
+    """Estimate the power spectral densities of several continuous slices in one pass
+
+    The slices must cover the same time range at the same sample rate, e.g. the force channels
+    of one trap. They're streamed side by side, one chunk at a time, so each is read only once.
+    See `Slice.psd()` for the parameters.
+
+    Returns
+    -------
+    List[PowerSpectrum]
+    """
+    sample_rate = slices[0].sample_rate
+    if not sample_rate:
+        raise NotImplementedError("Power spectra are only available for continuous channels")
+    if any((s.sample_rate, len(s), s._src.start) != (sample_rate, len(slices[0]),
+                                                    slices[0]._src.start) for s in slices[1:]):
+        raise ValueError("All channels must have the same time range and sample rate")
+
+    def to_samples(length):
+        if isinstance(length, str):
+            return int(round(Timeindex(length).total_ns * sample_rate / 1e9))
+        return length
+
+    averages = [WelchAverage(sample_rate, to_samples(segment_length), window,
+                             None if overlap is None else to_samples(overlap)) for _ in slices]
+    for chunk_group in _side_by_side_chunks(slices, _stream_chunk_size):
+        for average, chunk in zip(averages, chunk_group):
+            average.update(chunk.data)
+
+    return [average.result(s.labels) for average, s in zip(averages, slices)]
+
+
+def _same_timestamps(a, b):
+    """Do slices `a` and `b` have the same timestamps? Cheap for continuous slices."""
+    if len(a) != len(b):
+        return False
+    if a.sample_rate and b.sample_rate:
+        return (a.sample_rate, a._src.start) == (b.sample_rate, b._src.start)
+    return bool(np.array_equal(a.timestamps, b.timestamps))
+
+
+def _record_batches(slices, names, n_samples=None, duration=None):
+    """Stream slices with the same timestamps side by side as `pyarrow.RecordBatch`es
+
+    Each batch holds an int64 "timestamp" column and the data of each slice as a column with
+    the corresponding name in `names`, or no column if the name is `None`, e.g. for time tags.
+    The slices are chunked like `Slice.iter_chunks()` and empty chunks are skipped.
+    """
+    pa = import_pyarrow()
+
+    chunks = (s.iter_chunks(n_samples=n_samples, duration=duration) for s in slices)
+    for chunk_group in zip(*chunks):
+        if len(chunk_group[0]) == 0:
+            continue
+        columns = [np.asarray(chunk_group[0].timestamps, dtype=np.int64)]
+        columns += [chunk.data for chunk, name in zip(chunk_group, names) if name is not None]
+        yield pa.RecordBatch.from_arrays([pa.array(c) for c in columns],
+                                         names=["timestamp"] + [n for n in names if n])
+
+
+def _reference_state(source):
+    """The pickle state of `source` without any data which it can read from its file again"""
+    state = source.__dict__.copy()
+    for cached, lazy in (("_cached_data", "_src_data"), ("_cached_timestamps", "_src_timestamps")):
+        if isinstance(state.get(lazy), DatasetView):
+            state[cached] = None
+    if isinstance(state.get("_src_data"), DatasetView) and "_pyramid" in state:
+        state["_pyramid"], state["_pyramid_offset"] = None, 0
+    return state
+
+
+def _streamed(source):
+    """A shallow copy of `source` whose reads from HDF5 don't fill the cache of the file
+
+    Reading a long channel in chunks would otherwise evict everything else from the cache.
+    Data which is already cached is still used. Other objects are returned as they are.
+    """
+    if isinstance(source, DatasetView):
+        return source.streamed()
+    if isinstance(source, list):
+        return [_streamed(item) for item in source]
+    if not _is_source(source):
+        return source
+    streamed = source.__class__.__new__(source.__class__)  # `copy.copy()` would pickle it
+    streamed.__dict__.update({name: _streamed(value) for name, value in vars(source).items()})
+    return streamed
+
+
+def _is_sorted(timestamps):
+    """Check whether `timestamps` are monotonically increasing (allowing for duplicates)"""
+    return bool(np.all(timestamps[1:] >= timestamps[:-1]))
 
 
 class Continuous:
@@ -177,7 +946,8 @@ class Continuous:
     Parameters
     ----------
     data : array_like
-        Anything that's convertible to an `np.ndarray`.
+        Anything that's convertible to an `np.ndarray` and supports slicing, e.g. a lazily
+        read `DatasetView`. It's only converted when `data` is accessed.
     start : int
         Timestamp of the first data point.
     dt : int
@@ -189,15 +959,30 @@ class Continuous:
         self.start = start
         self.stop = start + len(data) * dt
         self.dt = dt
+        self._pyramid = None
+        self._pyramid_offset = 0
 
     def __len__(self):
         return len(self._src_data)
 
+    def __getstate__(self):
+        return _reference_state(self)
+
+    def _sub_range(self, start_idx, stop_idx, start):
+        """A source for an index range of this one, which shares its pyramid if it's built"""
+        data = self._src_data if self._cached_data is None else self._cached_data
+        sub_range = self.__class__(data[start_idx:stop_idx], start, self.dt)
+        if self._pyramid is not None and self._pyramid.is_built:
+            sub_range._pyramid = self._pyramid
+            sub_range._pyramid_offset = self._pyramid_offset + start_idx
+        return sub_range
+
     @staticmethod
-    def from_dataset(dset, y_label="y", calibration=None):
+    def from_dataset(dset, y_label="y", calibration=None, dtype=None, cache=None, memmap=False):
         start = dset.attrs["Start time (ns)"]
         dt = int(1e9 / dset.attrs["Sample rate (Hz)"])
-        return Slice(Continuous(dset[()], start, dt),
+        view = DatasetView(dset, dtype=dtype, cache=cache, memmap=memmap)
+        return Slice(Continuous(view, start, dt),
                      labels={"title": dset.name.strip("/"), "y": y_label}, calibration=calibration)
 
     @property
@@ -208,12 +993,20 @@ class Continuous:
 
     @property
     def timestamps(self):
-        return np.arange(self.start, self.stop, self.dt)
+        return AffineTimestamps(self.start, self.dt, len(self))
 
     @property
     def sample_rate(self):
         return int(1e9 / self.dt)
 
+    @property
+    def is_sorted(self):
+        return True
+
+    def searchsorted(self, timestamps):
+        """Indices of the first samples at or after `timestamps`"""
+        return self.timestamps.searchsorted(timestamps)
+
     def slice(self, start, stop):
         def to_index(t):
             """Convert a timestamp into a continuous channel index (assumes t >= self.start)"""
@@ -222,9 +1015,43 @@ class Continuous:
         fraction = (start - self.start) % self.dt
         start = max(start if fraction == 0 else start + self.dt - fraction, self.start)
 
-        start_idx = to_index(start)
-        stop_idx = to_index(stop)
-        return self.__class__(self.data[start_idx:stop_idx], start, self.dt)
+        # Slice the source directly unless it's already been loaded: for HDF5 datasets,
+        # this defers reading until `data` is requested and then reads only this index range
+        return self._sub_range(to_index(start), to_index(stop), start)
+
+    def index_slice(self, start_idx, stop_idx):
+        """Slice by index rather than timestamp"""
+        return self._sub_range(start_idx, stop_idx, self.start + start_idx * self.dt)
+
+    @property
+    def pyramid(self):
+        """Min/max level-of-detail pyramid of the data
+
+        It's built over the index range of this source only, and shared with its slices once
+        it's built. For HDF5 channels, it's kept in the cache of the file, so accessing the
+        same channel again reuses it.
+        """
+        if self._pyramid is None:
+            data = self._src_data
+            if self._cached_data is None and isinstance(data, DatasetView) \
+                    and data.cache is not None:
+                self._pyramid, first = data.cache.pyramid(data.key, data.start, data.stop,
+                                                          lambda: MinMaxPyramid(data.streamed()))
+                self._pyramid_offset = data.start - first
+            else:
+                self._pyramid = MinMaxPyramid(_streamed(data) if self._cached_data is None
+                                              else self._cached_data)
+        return self._pyramid
+
+    def envelope(self, start_idx, stop_idx, num_bins):
+        """The min/max envelope of an index range of this source, see `MinMaxPyramid.envelope()`
+
+        The returned bin centers are indices relative to this source.
+        """
+        start_idx, stop_idx = max(start_idx, 0), min(stop_idx, len(self))
+        centers, minima, maxima = self.pyramid.envelope(self._pyramid_offset + start_idx,
+                                                        self._pyramid_offset + stop_idx, num_bins)
+        return centers - self._pyramid_offset, minima, maxima
 
     def downsampled_by(self, factor, reduce):
         return self.__class__(_downsample(self.data, factor, reduce),
@@ -237,44 +1064,133 @@ class TimeSeries:
     Parameters
     ----------
     data : array_like
-        Anything that's convertible to an `np.ndarray`.
+        Anything that's convertible to an `np.ndarray` and supports slicing, e.g. a lazily
+        read `DatasetView`. It's only converted when `data` is accessed.
     timestamps : array_like
         An array of integer timestamps.
     """
     def __init__(self, data, timestamps):
         assert len(data) == len(timestamps)
-        # TODO: should be lazily evaluated
-        self.data = np.asarray(data)
-        self.timestamps = np.asarray(timestamps)
+        self._src_data = data
+        self._src_timestamps = timestamps
+        self._cached_data = None
+        self._cached_timestamps = None
+        self._sorted = None
 
     def __len__(self):
-        return len(self.data)
+        return len(self._src_data)
+
+    def __getstate__(self):
+        return _reference_state(self)
 
     @staticmethod
-    def from_dataset(dset, y_label="y", calibration=None):
-        return Slice(TimeSeries(dset["Value"], dset["Timestamp"]),
-                     labels={"title": dset.name.strip("/"), "y": y_label}, calibration=calibration)
+    def from_dataset(dset, y_label="y", calibration=None, dtype=None, cache=None, memmap=False):
+        view = DatasetView(dset, cache=cache, memmap=memmap)
+        time_series = TimeSeries(view.with_field("Value", dtype), view.with_field("Timestamp"))
+        time_series._sorted = True  # Bluelake exports time series in chronological order
+        return Slice(time_series, labels={"title": dset.name.strip("/"), "y": y_label},
+                     calibration=calibration)
+
+    def _load(self):
+        """Convert both sources to arrays
+
+        If they are views of the same compound dataset, the records are read in a single pass.
+        """
+        data, timestamps = self._src_data, self._src_timestamps
+        if self._cached_data is None and self._cached_timestamps is None \
+                and isinstance(data, DatasetView) and data.same_range(timestamps):
+            records = np.asarray(data.with_field(None))
+            values = records[data.field]
+            if values.dtype == data.dtype:
+                self._cached_data = values
+                self._cached_timestamps = records[timestamps.field]
+            else:
+                # Copy both fields so that the full precision records can be freed
+                self._cached_data = cast(values, data.dtype)
+                self._cached_timestamps = records[timestamps.field].copy()
+        else:
+            if self._cached_data is None:
+                self._cached_data = np.asarray(data)
+            self._load_timestamps()
+
+    def _load_timestamps(self):
+        """Convert only the timestamps, e.g. to find the index range of a slice"""
+        if self._cached_timestamps is None:
+            self._cached_timestamps = np.asarray(self._src_timestamps)
+        return self._cached_timestamps
+
+    @property
+    def data(self):
+        if self._cached_data is None:
+            self._load()
+        return self._cached_data
+
+    @property
+    def timestamps(self):
+        if self._cached_timestamps is None:
+            self._load()
+        return self._cached_timestamps
 
     @property
     def start(self):
-        if len(self.timestamps) > 0:
-            return self.timestamps[0]
+        if len(self) > 0:
+            timestamps = self._src_timestamps if self._cached_timestamps is None \
+                else self._cached_timestamps
+            return timestamps[0]
         else:
             raise IndexError("Start of empty time series is undefined")
 
     @property
     def stop(self):
-        if len(self.timestamps) > 0:
-            return self.timestamps[-1] + 1
+        if len(self) > 0:
+            timestamps = self._src_timestamps if self._cached_timestamps is None \
+                else self._cached_timestamps
+            return timestamps[-1] + 1
         else:
             raise IndexError("End of empty time series is undefined")
 
+    @property
+    def is_sorted(self):
+        """Are the timestamps monotonic? Only checked once and inherited by slices."""
+        if self._sorted is None:
+            self._sorted = _is_sorted(self._load_timestamps())
+        return self._sorted
+
+    def searchsorted(self, timestamps):
+        """Indices of the first samples at or after `timestamps` (requires `is_sorted`)"""
+        return np.searchsorted(self._load_timestamps(), timestamps)
+
     def slice(self, start, stop):
-        idx = np.logical_and(start <= self.timestamps, self.timestamps < stop)
-        return self.__class__(self.data[idx], self.timestamps[idx])
+        timestamps = self._load_timestamps()
+        if self.is_sorted:
+            # Binary search returns views instead of copying the selected range
+            first, last = np.searchsorted(timestamps, (start, stop))
+            data = self._src_data if self._cached_data is None else self._cached_data
+            sliced = self.__class__(data[first:last], timestamps[first:last])
+            sliced._sorted = True
+            return sliced
+
+        idx = np.flatnonzero(np.logical_and(start <= timestamps, timestamps < stop))
+        if idx.size == 0 or idx[-1] - idx[0] + 1 == idx.size:
+            # A contiguous range: slice the source directly to defer reading the values
+            first = idx[0] if idx.size > 0 else 0
+            data = self._src_data if self._cached_data is None else self._cached_data
+            return self.__class__(data[first:first + idx.size], timestamps[idx])
+        else:
+            return self.__class__(self.data[idx], timestamps[idx])
+
+    def index_slice(self, start_idx, stop_idx):
+        """Slice by index rather than timestamp"""
+        data = self._src_data if self._cached_data is None else self._cached_data
+        timestamps = self._src_timestamps if self._cached_timestamps is None \
+            else self._cached_timestamps
+        sliced = self.__class__(data[start_idx:stop_idx], timestamps[start_idx:stop_idx])
+        sliced._sorted = self._sorted
+        return sliced
 
     def downsampled_by(self, factor, reduce):
-        raise NotImplementedError("Downsampling is currently not available for time series data")
+        raise NotImplementedError("Downsampling by a factor is not available for time series data. "
+                                  "Use `downsampled_to()` to downsample to time windows instead.")
 
 
 class TimeTags:
@@ -283,37 +1199,417 @@ class TimeTags:
     Parameters
     ----------
     data : array_like
-        Anything that's convertible to an `np.ndarray`
+        Anything that's convertible to an `np.ndarray` and supports slicing, e.g. a lazily
+        read `DatasetView`. It's only converted when `data` is accessed.
     start : int
         Timestamp of the start of the channel slice
     stop : int
         Timestamp of the end of the channel slice
     """
     def __init__(self, data, start=None, stop=None):
-        self.data = np.asarray(data, dtype=np.int64)
+        self._src_data = data
+        self._cached_data = None
         self.start = start if start is not None else \
-            (self.data[0] if self.data.size > 0 else 0)
+            (data[0] if len(data) > 0 else 0)
         self.stop = stop if stop is not None else \
-            (self.data[-1]+1 if self.data.size > 0 else 0)
+            (data[-1]+1 if len(data) > 0 else 0)
+        self._sorted = None
 
     def __len__(self):
-        return self.data.size
+        return len(self._src_data)
+
+    def __getstate__(self):
+        return _reference_state(self)
 
     @staticmethod
-    def from_dataset(dset, y_label="y"):
-        return Slice(TimeTags(dset[()]))
+    def from_dataset(dset, y_label="y", cache=None, memmap=False):
+        time_tags = TimeTags(DatasetView(dset, cache=cache, memmap=memmap))
+        time_tags._sorted = True  # Bluelake exports time tags in chronological order
+        return Slice(time_tags)
+
+    @property
+    def data(self):
+        if self._cached_data is None:
+            self._cached_data = np.asarray(self._src_data, dtype=np.int64)
+        return self._cached_data
 
     @property
     def timestamps(self):
         # For time tag data, the data is the timestamps!
         return self.data
 
+    @property
+    def is_sorted(self):
+        """Are the time tags monotonic? Only checked once and inherited by slices."""
+        if self._sorted is None:
+            self._sorted = _is_sorted(self.data)
+        return self._sorted
+
+    def searchsorted(self, timestamps):
+        """Indices of the first time tags at or after `timestamps` (requires `is_sorted`)"""
+        return np.searchsorted(self.data, timestamps)
+
     def slice(self, start, stop):
+        if self.is_sorted:
+            if self._cached_data is None and isinstance(self._src_data, DatasetView):
+                # Bisecting only reads the ~log2(n) time tags it visits from disk
+                data = self._src_data
+                first, last = (bisect.bisect_left(data, t) for t in (start, stop))
+            else:
+                # Binary search returns a view instead of copying the selected range
+                data = self.data
+                first, last = np.searchsorted(data, (start, stop))
+            sliced = self.__class__(data[first:last], min(start, stop), max(start, stop))
+            sliced._sorted = True
+            return sliced
+
         idx = np.logical_and(start <= self.data, self.data < stop)
         return self.__class__(self.data[idx], min(start, stop), max(start, stop))
 
+    def index_slice(self, start_idx, stop_idx):
+        """Slice by index rather than timestamp
+
+        Consecutive index slices cover consecutive time ranges: each one stops where the first
+        time tag of the next one is.
+        """
+        data = self._src_data if self._cached_data is None else self._cached_data
+        start = self.start if start_idx == 0 else \
+            (self.stop if start_idx >= len(data) else data[start_idx])
+        stop = self.stop if stop_idx >= len(data) else data[stop_idx]
+        sliced = self.__class__(data[start_idx:stop_idx], start, stop)
+        sliced._sorted = self._sorted
+        return sliced
+
+    def downsampled_by(self, factor, reduce):
+        raise NotImplementedError("Downsampling is not available for time tag data. "
+                                  "Use `binned()` to count time tags instead.")
+
+    def binned(self, bin_width, chunk_size=2**20):
+        """Count the time tags in consecutive bins of `bin_width` ns starting at `self.start`
+
+        The time tags are read and counted `chunk_size` at a time, so memory use is bounded by
+        the number of bins rather than the number of time tags.
+        """
+        num_bins = max(0, -(-(self.stop - self.start) // bin_width))
+        counts = np.zeros(num_bins, dtype=np.int64)
+        data = _streamed(self._src_data) if self._cached_data is None else self._cached_data
+        for first in range(0, len(data), chunk_size):
+            bins = (np.asarray(data[first:first + chunk_size], dtype=np.int64) - self.start) \
+                // bin_width
+            bins = bins[np.logical_and(bins >= 0, bins < num_bins)]
+            counts += np.bincount(bins, minlength=num_bins)
+        return Continuous(counts, self.start, bin_width)
+
+
+class Derived:
+    """Base class for sources which are computed lazily from other sources
+
+    The result has the timestamps of the `_reference` source. Subclasses compute index ranges
+    of the data in `_evaluate()`, which is called one chunk at a time, and implement
+    `index_slice()` to return the source of a range without computing anything.
+    """
+    _reference = None
+
+    def __len__(self):
+        return len(self._reference)
+
+    def __getstate__(self):
+        return {**self.__dict__, "_cached_data": None}  # it's computed again when needed
+
+    def _evaluate(self, start_idx, stop_idx, out=None):
+        """Compute the index range `[start_idx, stop_idx)`, optionally into `out`"""
+        raise NotImplementedError
+
+    def index_slice(self, start_idx, stop_idx):
+        raise NotImplementedError
+
+    @property
+    def data(self):
+        if self._cached_data is None:
+            if len(self) <= _expression_chunk_size:
+                self._cached_data = self._evaluate(0, len(self))
+            else:
+                # The dtype of the result is only known once the first chunk has been evaluated
+                streamed = _streamed(self)
+                first = streamed._evaluate(0, _expression_chunk_size)
+                data = np.empty(len(self), dtype=first.dtype)
+                data[:first.size] = first
+                for start in range(first.size, len(self), _expression_chunk_size):
+                    stop = min(start + _expression_chunk_size, len(self))
+                    streamed._evaluate(start, stop, out=data[start:stop])
+                self._cached_data = data
+        return self._cached_data
+
+    @property
+    def timestamps(self):
+        return self._reference.timestamps
+
+    @property
+    def start(self):
+        return self._reference.start
+
+    @property
+    def stop(self):
+        return self._reference.stop
+
+    @property
+    def dt(self):
+        return self._reference.dt
+
+    @property
+    def sample_rate(self):
+        return self._reference.sample_rate
+
+    @property
+    def is_sorted(self):
+        return getattr(self._reference, "is_sorted", False)
+
+    def searchsorted(self, timestamps):
+        return self._reference.searchsorted(timestamps)
+
+    def slice(self, start, stop):
+        if self.is_sorted:
+            first, last = self.searchsorted([start, stop])
+            return self.index_slice(first, max(first, last))
+
+        mask = np.logical_and(start <= self.timestamps, self.timestamps < stop)
+        return TimeSeries(self.data[mask], self.timestamps[mask])
+
+    def downsampled_by(self, factor, reduce):
+        if not hasattr(self._reference, "dt"):
+            # Irregular timestamps: the reference source explains the alternatives
+            return self._reference.downsampled_by(factor, reduce)
+
+        # Evaluate chunks of whole downsampling blocks and reduce them right away
+        chunk_size = max(_expression_chunk_size // factor, 1) * factor
+        size = len(self) // factor * factor
+        streamed = _streamed(self)
+        data = np.concatenate([_downsample(streamed._evaluate(start, min(start + chunk_size, size)),
+                                           factor, reduce)
+                               for start in range(0, size, chunk_size)] or [np.empty(0)])
+        return Continuous(data, start=self.start + self.dt * (factor - 1) // 2,
+                          dt=self.dt * factor)
+
+
+class Expression(Derived):
+    """A source which lazily applies an element-wise `np.ufunc` to aligned channel sources
+
+    The operands are other sources (including expressions) or scalars. The data is evaluated
+    in chunks: the entire expression is computed for one index range of the operands at a time,
+    so intermediate results are never larger than a chunk. Slicing an expression slices its
+    operands, so only the selected range is ever read or computed.
+
+    Parameters
+    ----------
+    ufunc : np.ufunc
+        An element-wise function with a single output, e.g. `np.add` or `np.sqrt`.
+    operands : list
+        Sources and scalars. All sources must have the same number of samples, start and stop.
+        The timestamps are those of the first source.
+    """
+    def __init__(self, ufunc, operands):
+        self.ufunc = ufunc
+        self.operands = operands
+        self._cached_data = None
+
+        sources = [op for op in operands if _is_source(op)]
+        self._reference = sources[0]
+        if any((len(src), src.start, src.stop) != (len(self), self.start, self.stop)
+               for src in sources[1:]):
+            raise ValueError("Channels must have the same timestamps to be combined")
+
+    def _evaluate(self, start_idx, stop_idx, out=None):
+        args = [op._evaluate(start_idx, stop_idx) if isinstance(op, Derived)
+                else op.index_slice(start_idx, stop_idx).data if _is_source(op) else op
+                for op in self.operands]
+        return self.ufunc(*args) if out is None else self.ufunc(*args, out=out)
+
+    def index_slice(self, start_idx, stop_idx):
+        """Slice by index rather than timestamp"""
+        return self.__class__(self.ufunc, [op.index_slice(start_idx, stop_idx) if _is_source(op)
+                                           else op for op in self.operands])
+
+
+class Rolling(Derived):
+    """A source which reduces a centered sliding window around each sample of another source
+
+    The data is computed in chunks. Each chunk reads its index range of the parent plus the
+    overlap which the windows at its edges need, so the parent is never loaded all at once.
+    Near the edges of the parent, windows are cut off, as in `detail.rolling.rolling()`.
+
+    Parameters
+    ----------
+    parent : Any
+        The source of the samples which are reduced.
+    window : int
+        The number of samples per window.
+    reduce : callable
+        A function for which `has_rolling_kernel()` holds.
+    start_idx, stop_idx : int
+        The index range of the parent which this source covers. Defaults to all of it. Windows
+        extend beyond this range when possible, so slices of a rolling source have the same
+        values as the original.
+    """
+    def __init__(self, parent, window, reduce, start_idx=0, stop_idx=None):
+        self.parent = parent
+        self.window = window
+        self.reduce = reduce
+        self._offset = start_idx
+        self._reference = parent.index_slice(start_idx, len(parent) if stop_idx is None
+                                             else stop_idx)
+        self._cached_data = None
+
+    def _evaluate(self, start_idx, stop_idx, out=None):
+        first, last = self._offset + start_idx, self._offset + stop_idx
+        lo = max(first - self.window // 2, 0)
+        hi = min(last - self.window // 2 + self.window, len(self.parent))
+        data = np.asarray(self.parent.index_slice(lo, hi).data)
+        result = rolling(data, self.window, self.reduce, first - lo, last - lo)
+        if out is None:
+            return result
+        out[:] = result
+        return out
+
+    def index_slice(self, start_idx, stop_idx):
+        """Slice by index rather than timestamp"""
+        start_idx, stop_idx = (min(max(i, 0), len(self)) for i in (start_idx, stop_idx))
+        return self.__class__(self.parent, self.window, self.reduce, self._offset + start_idx,
+                              self._offset + max(start_idx, stop_idx))
+
+
+def _is_source(operand):
+    """Is `operand` a channel source rather than a scalar?"""
+    return hasattr(operand, "index_slice")
+
+
+def concatenate(sources):
+    """Join the non-empty `sources` of consecutive recordings into a single source"""
+    sources = [src for src in sources if len(src) > 0]
+    if not sources:
+        return Empty()
+    return sources[0] if len(sources) == 1 else Concatenated(sources)
+
+
+class Concatenated:
+    """A source which joins the sources of consecutive recordings, e.g. of several files
+
+    Slicing only slices the sources which overlap the requested range, so the others are
+    never read. Use `concatenate()` to skip empty sources.
+
+    Parameters
+    ----------
+    sources : list
+        Non-empty sources in chronological order.
+    """
+    def __init__(self, sources):
+        self.sources = sources
+        self._offsets = np.cumsum([0] + [len(src) for src in sources])
+        self._cached_data = None
+        self._cached_timestamps = None
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def __getstate__(self):
+        return {**self.__dict__, "_cached_data": None, "_cached_timestamps": None}
+
+    @property
+    def data(self):
+        if self._cached_data is None:
+            self._cached_data = np.concatenate([np.asarray(src.data) for src in self.sources])
+        return self._cached_data
+
+    @property
+    def timestamps(self):
+        if self._cached_timestamps is None:
+            self._cached_timestamps = np.concatenate([np.asarray(src.timestamps)
+                                                      for src in self.sources])
+        return self._cached_timestamps
+
+    @property
+    def start(self):
+        return self.sources[0].start
+
+    @property
+    def stop(self):
+        return self.sources[-1].stop
+
+    def _is_ordered(self):
+        """Do the sources follow each other without overlapping in time?"""
+        return all(a.stop <= b.start for a, b in zip(self.sources[:-1], self.sources[1:]))
+
+    @property
+    def is_sorted(self):
+        return self._is_ordered() and \
+            all(getattr(src, "is_sorted", False) for src in self.sources)
+
+    def searchsorted(self, timestamps):
+        """Indices of the first samples at or after `timestamps` (requires `is_sorted`)"""
+        timestamps = np.asarray(timestamps)
+        which = np.searchsorted([src.start for src in self.sources[1:]], timestamps, "right")
+        indices = np.empty(timestamps.shape, dtype=np.int64)
+        for i, (src, offset) in enumerate(zip(self.sources, self._offsets)):
+            selected = which == i
+            indices[selected] = offset + src.searchsorted(timestamps[selected])
+        return indices
+
+    def slice(self, start, stop):
+        # Only the sources which overlap the range are checked, so the others aren't read
+        overlapping = [src for src in self.sources if src.start < stop and start < src.stop]
+        if self._is_ordered() and all(getattr(src, "is_sorted", False) for src in overlapping):
+            return concatenate([src.slice(start, stop) for src in overlapping])
+
+        mask = np.logical_and(start <= self.timestamps, self.timestamps < stop)
+        return TimeSeries(self.data[mask], self.timestamps[mask])
+
+    def index_slice(self, start_idx, stop_idx):
+        parts = []
+        for src, offset in zip(self.sources, self._offsets):
+            first, last = max(start_idx - offset, 0), min(stop_idx - offset, len(src))
+            if first < last:
+                parts.append(src.index_slice(first, last))
+        return concatenate(parts)
+
     def downsampled_by(self, factor, reduce):
-        raise NotImplementedError("Downsampling is not available for time tag data")
+        """Downsample each recording separately, so blocks never span the gap between them"""
+        return concatenate([src.downsampled_by(factor, reduce) for src in self.sources])
+
+
+class Deferred:
+    """A source which is only made when it's first used, e.g. the channel of one file of many
+
+    Its time range and length are known upfront, e.g. from the index of the file, so
+    `Concatenated` can skip it without making it when it doesn't overlap a slice.
+
+    Parameters
+    ----------
+    make : callable
+        Returns the actual source.
+    start, stop : int
+        The time range of the source.
+    length : int
+        The number of samples of the source.
+    """
+    def __init__(self, make, start, stop, length):
+        self._make = make
+        self.start = start
+        self.stop = stop
+        self._length = length
+        self._src = None
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def source(self):
+        if self._src is None:
+            self._src = self._make()
+        return self._src
+
+    def __getattr__(self, name):
+        if name.startswith("_"):  # not forwarded, e.g. while unpickling
+            raise AttributeError(name)
+        return getattr(self.source, name)
 
 
 class Empty:
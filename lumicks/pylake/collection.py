@@ -0,0 +1,214 @@
+import collections.abc
+import glob
+import os
+from collections import namedtuple
+from typing import List
+
+from .calibration import _filter_calibration
+from .channel import Slice, Concatenated, Deferred
+from .detail.index import find_index
+from .detail.mixin import Force, DownsampledFD, PhotonCounts, PhotonTimeTags
+from .file import File
+
+__all__ = ["FileCollection"]
+
+CatalogEntry = namedtuple("CatalogEntry", ["start", "stop", "kind", "name", "file", "item"])
+CatalogEntry.__doc__ = """A timeline item of a `FileCollection`, e.g. a kymograph"""
+
+
+class FileCollection(Force, DownsampledFD, PhotonCounts, PhotonTimeTags):
+    """Consecutive Bluelake HDF5 files, e.g. the exports of a day of experiments, as one timeline
+
+    Channels are concatenated over all files in chronological order. Slicing them only opens
+    and reads the files which overlap the selected time range. The time ranges are looked up in
+    the metadata index of each file, see `File.channels`. Files which were indexed before, and
+    haven't changed since, aren't opened for this.
+
+    Parameters
+    ----------
+    paths : Union[str, List[str]]
+        A directory, a single file or a list of files.
+    pattern : str
+        The files to include when `paths` is a directory.
+    **kwargs
+        Forwarded to `File`, e.g. `dtypes` or `cache_size`.
+
+    Examples
+    --------
+    ::
+
+        from lumicks import pylake
+
+        collection = pylake.FileCollection("experiments/2020-01-21")
+        collection.force1x["10m":"20m"].plot()
+        kymos = [entry.item for entry in collection.catalog if entry.kind == "kymo"]
+    """
+    def __init__(self, paths, pattern="*.h5", **kwargs):
+        if isinstance(paths, (str, os.PathLike)):
+            if not os.path.exists(paths):
+                raise FileNotFoundError(f"No such file or directory: '{paths}'")
+            paths = sorted(glob.glob(os.path.join(paths, pattern))) if os.path.isdir(paths) \
+                else [paths]
+        self.paths = [str(path) for path in paths]
+        self._file_kwargs = kwargs
+        self._opened = {}  # path -> File
+        self._indices = None  # in chronological order
+        self._time_ranges = None
+
+    def __repr__(self):
+        return f"lumicks.pylake.FileCollection({self.paths})"
+
+    def __len__(self):
+        return len(self.paths)
+
+    @staticmethod
+    def _time_range(index):
+        """The time range which is covered by the channels of an indexed file"""
+        channels = [c for c in index["channels"].values() if c["start"] is not None]
+        if not channels:
+            return None, None
+        return min(c["start"] for c in channels), max(c["stop"] for c in channels)
+
+    def _file(self, path):
+        if path not in self._opened:
+            self._opened[path] = File(path, **self._file_kwargs)
+        return self._opened[path]
+
+    def _scan(self):
+        """Look up the index of each file and sort them by time. Files without channels go last.
+
+        Only files which haven't been indexed before, or which changed since, are opened.
+        """
+        indices = [(path, find_index(path) or self._file(path)._index) for path in self.paths]
+        time_ranges = [self._time_range(index) for _, index in indices]
+        order = sorted(range(len(indices)),
+                       key=lambda i: (time_ranges[i][0] is None, time_ranges[i][0] or 0))
+        self._indices = [indices[i] for i in order]
+        self._time_ranges = [time_ranges[i] for i in order]
+
+    @property
+    def files(self) -> List[File]:
+        """The files in chronological order"""
+        if self._indices is None:
+            self._scan()
+        return [self._file(path) for path, _ in self._indices]
+
+    @property
+    def time_ranges(self) -> list:
+        """The `(start, stop)` timestamps of each file in `files`"""
+        if self._time_ranges is None:
+            self._scan()
+        return self._time_ranges
+
+    def _concatenate(self, paths, getter, *args):
+        """Join a channel of all files which have it, or raise `KeyError`
+
+        The channel of each file is `getattr(file, getter)(*args)`. It's only made once it's read,
+        so slicing only opens the files which overlap the slice. Which files have the channel,
+        and its time range in each, is looked up in their index at the first of `paths` which
+        it contains.
+        """
+        if self._indices is None:
+            self._scan()
+        channels = []
+        for path, index in self._indices:
+            info = next((index["channels"][p] for p in paths if p in index["channels"]), None)
+            if info and info["length"] > 0:
+                channels.append(_FileChannel(self, path, getter, args, info))
+        if not channels:
+            raise KeyError("None of the files contain this channel")
+        if len(channels) == 1:
+            return channels[0].slice
+
+        sources = [Deferred(c.source, c.start, c.stop, c.length) for c in channels]
+        return Slice(Concatenated(sources), _Labels(channels[0]), _Calibration(channels))
+
+    def __getitem__(self, path):
+        """The channel at `path`, e.g. "Force HF/Force 1x", concatenated over all files"""
+        return self._concatenate([path.strip("/")], "__getitem__", path)
+
+    def _get_force(self, n, xy):
+        return self._concatenate([f"Force HF/Force {n}{xy}"], "_get_force", n, xy)
+
+    def _get_downsampled_force(self, n, xy):
+        # The sum force can be missing, and is then computed from its x and y components
+        paths = [f"Force LF/Force {n}{xy}"] if xy else \
+            [f"Force LF/Force {n}", f"Force LF/Trap {n}", f"Force LF/Force {n}x"]
+        return self._concatenate(paths, "_get_downsampled_force", n, xy)
+
+    def _get_distance(self, n):
+        return self._concatenate([f"Distance/Distance {n}"], "_get_distance", n)
+
+    def _get_photon_count(self, name):
+        return self._concatenate([f"Photon count/{name}"], "_get_photon_count", name)
+
+    def _get_photon_time_tags(self, name):
+        return self._concatenate([f"Photon Time Tags/{name}"], "_get_photon_time_tags", name)
+
+    @property
+    def catalog(self) -> List[CatalogEntry]:
+        """The kymographs, scans and FD curves of all files, sorted by their start time
+
+        Each entry is a named tuple of the `start` and `stop` timestamps, the `kind` ("kymo",
+        "scan" or "fdcurve"), the `name`, the `file` which contains it and the `item` itself.
+        """
+        entries = []
+        for file in self.files:
+            for kind, items in (("kymo", file.kymos), ("scan", file.scans),
+                                ("fdcurve", file.fdcurves)):
+                entries += [CatalogEntry(item.start, item.stop, kind, name, file, item)
+                            for name, item in items.items()]
+        return sorted(entries, key=lambda entry: (entry.start, entry.kind, entry.name))
+
+
+class _FileChannel:
+    """The channel of one file of a collection, which is only made once it's used"""
+    def __init__(self, collection, path, getter, args, info):
+        self._collection = collection
+        self._path = path
+        self._getter = getter
+        self._args = args
+        self.start, self.stop, self.length = info["start"], info["stop"], info["length"]
+        self._slice = None
+
+    @property
+    def slice(self) -> Slice:
+        if self._slice is None:
+            file = self._collection._file(self._path)
+            self._slice = getattr(file, self._getter)(*self._args)
+        return self._slice
+
+    def source(self):
+        return self.slice._src
+
+
+class _Labels(collections.abc.Mapping):
+    """The plot labels of a channel, which are only looked up once they're used"""
+    def __init__(self, channel):
+        self._channel = channel
+
+    def __getitem__(self, key):
+        return self._channel.slice.labels[key]
+
+    def __iter__(self):
+        return iter(self._channel.slice.labels)
+
+    def __len__(self):
+        return len(self._channel.slice.labels)
+
+    def __bool__(self):
+        return True  # without looking them up, e.g. for `labels or {}`
+
+
+class _Calibration:
+    """The force calibrations of all files, which are only read once they're requested"""
+    def __init__(self, channels):
+        self._channels = channels
+
+    def filter_calibration(self, start, stop):
+        calibrations = [c.slice._calibration for c in self._channels if c.slice._calibration]
+        if not calibrations:
+            return []
+        return _filter_calibration(calibrations[0]._time_field,
+                                   [item for c in calibrations for item in c._items],
+                                   start, stop)
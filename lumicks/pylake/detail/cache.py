@@ -0,0 +1,139 @@
+import collections
+
+CacheInfo = collections.namedtuple("CacheInfo", ["hits", "misses", "evictions", "size", "max_size"])
+
+
+class DatasetCache:
+    """A least-recently-used cache of index ranges which were read from HDF5 datasets
+
+    Ranges which are contained in a cached range are served from it, e.g. the part of
+    a photon count channel which belongs to a kymograph after the whole channel has been read.
+    Ranges are only kept once they're read for the second time, so data which is read once
+    doesn't take up memory twice. Cached arrays are shared, so they're made read-only, and
+    users get copies of them. The cache also keeps the min/max pyramids of the most recently
+    plotted ranges, see `pyramid()`.
+
+    Parameters
+    ----------
+    max_size : int
+        The budget in bytes. The least recently used arrays are evicted to stay within it.
+        Arrays which are larger than the budget are not cached at all.
+    """
+    max_pyramids = 32
+    max_seen = 1024  # the number of ranges which are remembered until they're read again
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()  # (dataset, start, stop) -> np.ndarray
+        self._pyramids = collections.OrderedDict()  # (dataset, start, stop) -> MinMaxPyramid
+        self._seen = collections.OrderedDict()  # (dataset, start, stop) which were read once
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, dataset, start, stop, read, store=True):
+        """Return the index range `[start, stop)` of `dataset` from the cache or else `read()` it
+
+        Parameters
+        ----------
+        dataset : Hashable
+            Identifies the dataset, including any conversions which `read()` applies.
+        start, stop : int
+        read : callable
+            Reads the range from the file.
+        store : bool
+            Keep the data which is read. Streaming reads don't, because one pass over a long
+            channel would evict everything else.
+        """
+        for key in reversed(self._entries):
+            cached_dataset, first, last = key
+            if cached_dataset == dataset and first <= start and stop <= last:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key][start - first:stop - first]
+
+        self._misses += 1
+        data = read()
+        if store and data.nbytes <= self.max_size:
+            key = dataset, start, stop
+            if self._seen.pop(key, True):  # the first read
+                self._seen[key] = False
+                if len(self._seen) > self.max_seen:
+                    self._seen.popitem(last=False)
+                return data
+
+            while self._size + data.nbytes > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.nbytes
+                self._evictions += 1
+            data.flags.writeable = False
+            self._entries[dataset, start, stop] = data
+            self._size += data.nbytes
+        return data
+
+    def pyramid(self, dataset, start, stop, make):
+        """Return a min/max pyramid which covers `[start, stop)` of `dataset` and its first index
+
+        A pyramid of this range, or a built pyramid of a range which contains it, is reused.
+        Otherwise, `make()` creates one of exactly this range. Pyramids don't count towards
+        `max_size`, because they only take up about 1% of the memory of their data.
+        """
+        for key in reversed(self._pyramids):
+            cached_dataset, first, last = key
+            pyramid = self._pyramids[key]
+            if cached_dataset == dataset and ((first, last) == (start, stop) or
+                                              (first <= start and stop <= last
+                                               and pyramid.is_built)):
+                self._pyramids.move_to_end(key)
+                return pyramid, first
+
+        pyramid = self._pyramids[dataset, start, stop] = make()
+        if len(self._pyramids) > self.max_pyramids:
+            self._pyramids.popitem(last=False)
+        return pyramid, start
+
+    def resize(self, max_size):
+        """Change `max_size`, evicting the least recently used arrays if they don't fit"""
+        self.max_size = max_size
+        while self._size > max_size:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.nbytes
+            self._evictions += 1
+
+    def info(self):
+        """Hit and miss statistics and the current size in bytes"""
+        return CacheInfo(self._hits, self._misses, self._evictions, self._size, self.max_size)
+
+    def clear(self):
+        """Evict everything, but keep the statistics"""
+        self._entries.clear()
+        self._pyramids.clear()
+        self._seen.clear()
+        self._size = 0
+
+
+shared_cache = DatasetCache(64 * 2**20)
+
+
+def set_cache_size(max_size):
+    """Set the memory budget of the channel data cache which is shared by all files
+
+    Channel data which is read repeatedly, e.g. by kymographs, scans and FD curves, is kept in
+    memory as long as it fits, so it's read from disk only twice. The default is 64 MiB. Files
+    which are opened with their own `cache_size` don't use the shared cache.
+
+    Parameters
+    ----------
+    max_size : int
+        The budget in bytes. 0 disables the cache.
+
+    Examples
+    --------
+    ::
+
+        from lumicks import pylake
+
+        pylake.set_cache_size(1024 * 2**20)  # 1 GiB
+    """
+    shared_cache.resize(max_size)
@@ -0,0 +1,196 @@
+import operator
+import os
+import h5py
+import numpy as np
+from .dtypes import cast
+from .handles import handle_pool
+
+
+class DatasetView:
+    """A lazily read index range of an HDF5 dataset
+
+    Nothing is read from disk until the view is converted to an `np.ndarray`. At that point,
+    only the viewed index range (hyperslab) is read. Slicing a view returns another view.
+
+    Views keep a reference to the dataset: the file name, its GUID and the path of the
+    dataset. If the file is closed, e.g. by the pool of open files, it's reopened once the view
+    is read again. Views are pickled as this reference and the index range.
+
+    Parameters
+    ----------
+    dset : h5py.Dataset
+        A one-dimensional HDF5 dataset.
+    start, stop : int
+        Index range of the view within `dset`. Defaults to the entire dataset.
+    field : Optional[str]
+        For compound datasets: only read this field.
+    dtype : Optional[np.dtype]
+        Convert the data to this type while reading it, e.g. to save memory. Defaults to the
+        data type of the dataset.
+    cache : Optional[DatasetCache]
+        Look up the data in this cache before reading it from the file. The arrays which are
+        served from it are copies, so they can be modified.
+    memmap : bool
+        Read the data from a memory map of the dataset if possible, see `memory_map()`.
+    """
+    def __init__(self, dset, start=0, stop=None, field=None, dtype=None, cache=None,
+                 memmap=False):
+        self._dset = dset
+        self.start = start
+        self.stop = dset.shape[0] if stop is None else stop
+        self.field = field
+        self._dtype = None if dtype is None else np.dtype(dtype)
+        self.cache = cache
+        self._memmap = memmap
+        self._mapped = None
+        self._store = True  # keep the data which is read in the cache
+        self._reference = None  # to reopen the dataset if its file was closed
+        self._file_state = None  # tells exports to the same path apart
+        if dset is not None:
+            filename = os.path.abspath(os.fsdecode(h5py.h5f.get_name(dset.id)))
+            self._reference = filename, handle_pool.guid(filename), dset.name
+            self._file_state = handle_pool.state(filename)
+        if memmap and dset is not None:
+            self._mapped = memory_map(dset)  # shared by all sub-views
+            self._memmap = self._mapped is not None
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getstate__(self):
+        filename, guid, path = self._reference
+        if guid is None:  # the file wasn't opened by the pool
+            guid = self.dset.file.attrs.get("GUID")
+        return {"reference": (filename, guid, path),
+                "start": self.start, "stop": self.stop, "field": self.field,
+                "dtype": self._dtype, "memmap": self._memmap}
+
+    def __setstate__(self, state):
+        self.__init__(None, state["start"], state["stop"], state["field"], state["dtype"],
+                      memmap=state["memmap"])
+        self._reference = state["reference"]
+
+    @property
+    def dset(self) -> h5py.Dataset:
+        filename, guid, path = self._reference
+        if self._dset is not None and self._dset.id.valid:
+            handle_pool.touch(filename)
+        else:
+            self._dset = handle_pool.acquire(filename, guid)[path]
+        return self._dset
+
+    @property
+    def mapped(self):
+        """A memory map of the whole dataset or `None` if it's disabled or not possible"""
+        if self._memmap and self._mapped is None:
+            self._mapped = memory_map(self.dset)
+            self._memmap = self._mapped is not None
+        return self._mapped
+
+    def _view(self, start, stop, field, dtype):
+        view = self.__class__.__new__(self.__class__)
+        view.__dict__.update(self.__dict__)
+        view.start, view.stop, view.field = start, stop, field
+        view._dtype = None if dtype is None else np.dtype(dtype)
+        return view
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            if item.step not in (None, 1):
+                raise IndexError("Slice steps are not supported")
+            start, stop, _ = item.indices(len(self))
+            return self._view(self.start + start, self.start + max(start, stop), self.field,
+                              self._dtype)
+
+        index = operator.index(item)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Index out of range")
+        return self._read(self.start + index)
+
+    def __array__(self, dtype=None, copy=None):
+        if len(self) == 0:
+            data = np.empty(0, self.dtype)
+        elif self.cache is None or (self.mapped is not None and self._dtype is None):
+            data = self._read(slice(self.start, self.stop))
+        else:
+            data = self.cache.get(self.key, self.start, self.stop,
+                                  lambda: self._read(slice(self.start, self.stop)), self._store)
+            if not data.flags.writeable:
+                return np.array(data, dtype=dtype)  # don't hand out the shared, read-only array
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+    def streamed(self):
+        """A view of the same range whose reads are looked up in the cache, but don't fill it
+
+        Used for reading datasets in chunks, which would otherwise evict everything else.
+        """
+        view = self._view(self.start, self.stop, self.field, self._dtype)
+        view._store = False
+        return view
+
+    @property
+    def key(self):
+        """Identifies the file, dataset, field and data type, e.g. for `DatasetCache`"""
+        filename, _, path = self._reference
+        return filename, self._file_state, path, self.field, self.dtype
+
+    def with_field(self, field, dtype=None):
+        """Return a view of the same index range, but of another field (or `None` for all)"""
+        return self._view(self.start, self.stop, field, dtype)
+
+    def same_range(self, other):
+        """Does `other` view the same index range of the same dataset? Fields may differ."""
+        return (isinstance(other, DatasetView) and other._reference[::2] == self._reference[::2]
+                and (other.start, other.stop) == (self.start, self.stop))
+
+    def _read(self, selection):
+        if self.mapped is not None:
+            # Slicing the memory map doesn't copy anything, unless the data type is converted
+            data = self.mapped[selection] if self.field is None else \
+                self.mapped[self.field][selection]
+        elif self.field is None:
+            if self._dtype is not None and self._dtype.kind == "f" and isinstance(selection, slice):
+                # HDF5 converts floats while reading, without a full precision copy in memory
+                data = np.empty(selection.stop - selection.start, dtype=self._dtype)
+                self.dset.read_direct(data, selection)
+                return data
+            data = self.dset[selection]
+        else:
+            data = self.dset[selection, self.field]
+        return data if self._dtype is None else cast(data, self._dtype)[()]
+
+    @property
+    def chunk_size(self):
+        """Number of elements per HDF5 chunk or `None` if the dataset isn't chunked"""
+        return self.dset.chunks[0] if self.dset.chunks else None
+
+    @property
+    def dtype(self):
+        if self._dtype is not None:
+            return self._dtype
+        return self.dset.dtype if self.field is None else self.dset.dtype[self.field]
+
+
+def memory_map(dset):
+    """Map `dset` into memory without reading it, or return `None` if that's not possible
+
+    This only works for contiguous, uncompressed datasets of files which are opened read-only
+    from disk, and whose data type has the same layout in memory as in the file. Slicing the
+    map costs only page faults, and processes which map the same file share the page cache.
+
+    Parameters
+    ----------
+    dset : h5py.Dataset
+    """
+    if dset.chunks is not None or dset.external or dset.file.mode != "r" \
+            or dset.file.driver not in ("sec2", "stdio") or dset.dtype.hasobject:
+        return None
+
+    offset = dset.id.get_offset()  # `None` if the storage isn't allocated, e.g. empty datasets
+    if offset is None or dset.id.get_type() != h5py.h5t.py_create(dset.dtype):
+        return None
+    return np.memmap(dset.file.filename, dtype=dset.dtype, mode="r", offset=offset,
+                     shape=dset.shape)
+
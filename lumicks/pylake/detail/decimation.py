@@ -0,0 +1,108 @@
+import numpy as np
+
+
+def _block_bounds(size, block_size):
+    return np.arange(0, size, block_size)
+
+
+class MinMaxPyramid:
+    """A level-of-detail pyramid of the minima and maxima of blocks of samples
+
+    Level `k` holds the envelope of consecutive blocks of `block_size * factor**k` samples.
+    The pyramid is built on first use by streaming over the data, after which the envelope of
+    any range of samples can be looked up in a resolution suitable for plotting.
+
+    Parameters
+    ----------
+    data : array_like
+        Anything that's convertible to an `np.ndarray` and supports slicing, e.g. a lazily
+        read `DatasetView`.
+    block_size : int
+        The number of samples per block in the finest level.
+    factor : int
+        The ratio between the block sizes of consecutive levels.
+    """
+    def __init__(self, data, block_size=256, factor=4):
+        self._data = data
+        self.block_size = block_size
+        self.factor = factor
+        self._levels = None
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def is_built(self):
+        return self._levels is not None
+
+    @property
+    def levels(self):
+        """List of `(minima, maxima)` tuples, from fine to coarse"""
+        if self._levels is None:
+            self._levels = self._build()
+        return self._levels
+
+    def _build(self, chunk_blocks=4096):
+        if len(self) == 0:
+            return []
+
+        # Stream over the data so that only `chunk_blocks` blocks are in memory at once
+        chunk_size = self.block_size * chunk_blocks
+        minima, maxima = [], []
+        for first in range(0, len(self), chunk_size):
+            chunk = np.asarray(self._data[first:first + chunk_size])
+            bounds = _block_bounds(chunk.size, self.block_size)
+            minima.append(np.minimum.reduceat(chunk, bounds))
+            maxima.append(np.maximum.reduceat(chunk, bounds))
+
+        levels = [(np.concatenate(minima), np.concatenate(maxima))]
+        while levels[-1][0].size > 1:
+            minima, maxima = levels[-1]
+            bounds = _block_bounds(minima.size, self.factor)
+            levels.append((np.minimum.reduceat(minima, bounds), np.maximum.reduceat(maxima, bounds)))
+        return levels
+
+    def _raw_envelope(self, start, stop, bin_size):
+        data = np.asarray(self._data[start:stop])
+        bounds = _block_bounds(data.size, bin_size)
+        return (start + bounds, np.minimum(start + bounds + bin_size, stop),
+                np.minimum.reduceat(data, bounds), np.maximum.reduceat(data, bounds))
+
+    def envelope(self, start, stop, num_bins):
+        """The envelope of the samples in `[start, stop)` in at least `num_bins` bins
+
+        Returns at most `factor * num_bins` bins (plus partial bins at the edges), unless the
+        range holds fewer samples, in which case every sample is its own bin.
+
+        Returns
+        -------
+        centers : np.ndarray
+            The (fractional) sample index at the center of each bin.
+        minima, maxima : np.ndarray
+        """
+        start, stop = max(start, 0), min(stop, len(self))
+        size = stop - start
+        if size <= 0:
+            return np.empty(0), np.empty(0), np.empty(0)
+
+        if size < num_bins * self.block_size:
+            # Too few samples for the finest level: the raw data is small enough to reduce here
+            first, last, minima, maxima = self._raw_envelope(start, stop, max(size // num_bins, 1))
+        else:
+            level = 0
+            while level + 1 < len(self.levels) and \
+                    size // (self.block_size * self.factor**(level + 1)) >= num_bins:
+                level += 1
+
+            # Look up the bins which are fully inside the range and reduce the partial bins at
+            # the edges from the raw data
+            bin_size = self.block_size * self.factor**level
+            first_bin, last_bin = -(-start // bin_size), stop // bin_size
+            head = self._raw_envelope(start, min(first_bin * bin_size, stop), bin_size)
+            tail = self._raw_envelope(max(last_bin * bin_size, start), stop, bin_size)
+            body = (np.arange(first_bin, last_bin) * bin_size,
+                    np.arange(first_bin + 1, last_bin + 1) * bin_size,
+                    *(x[first_bin:last_bin] for x in self.levels[level]))
+            first, last, minima, maxima = (np.concatenate(x) for x in zip(head, body, tail))
+
+        return (first + last - 1) / 2, minima, maxima
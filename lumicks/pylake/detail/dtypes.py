@@ -0,0 +1,93 @@
+import numpy as np
+
+compact_dtypes = {
+    "force": np.float32,
+    "distance": np.float32,
+    "photon_count": np.uint16,
+}
+"""Data types which use a half or a quarter of the memory of the stored channels"""
+
+_group_kinds = {
+    "Force HF": "force",
+    "Force LF": "force",
+    "Distance": "distance",
+    "Photon count": "photon_count",
+}
+
+_default_dtypes = {}
+
+
+def set_default_dtypes(dtypes):
+    """Set the data types in which channels of all files are loaded, unless specified per file
+
+    Parameters
+    ----------
+    dtypes : Union[str, Dict[str, np.dtype], None]
+        "compact" for `float32` force and distance and `uint16` photon counts, or a dict which
+        maps any of the channel kinds "force", "distance" and "photon_count" to a data type.
+        `None` or "stored" keeps the data types of the file, which is the default.
+
+    Examples
+    --------
+    ::
+
+        from lumicks import pylake
+
+        pylake.set_default_dtypes("compact")
+        pylake.set_default_dtypes({"force": np.float32})
+    """
+    dtypes = resolve_dtypes(dtypes)
+    _default_dtypes.clear()
+    _default_dtypes.update(dtypes)
+
+
+def resolve_dtypes(dtypes):
+    """Convert the `dtypes` argument of `File` or `set_default_dtypes()` into a dict"""
+    if dtypes is None or dtypes == "stored":
+        return {}
+    elif dtypes == "compact":
+        return dict(compact_dtypes)
+    elif isinstance(dtypes, dict):
+        unknown = set(dtypes) - set(compact_dtypes)
+        if unknown:
+            raise ValueError(f"Unknown channel kinds {sorted(unknown)}. Valid options are "
+                             f"{', '.join(compact_dtypes)}")
+        return {kind: np.dtype(dtype) for kind, dtype in dtypes.items()}
+    else:
+        raise ValueError("Invalid argument for dtypes. Valid options are 'compact', 'stored' or a "
+                         "dict of channel kinds and data types")
+
+
+def default_dtypes():
+    """The data types which were set using `set_default_dtypes()`"""
+    return dict(_default_dtypes)
+
+
+def dtype_for(dtypes, group_name):
+    """The data type for channels in the HDF5 group `group_name` or `None` to keep it"""
+    return dtypes.get(_group_kinds.get(group_name))
+
+
+def cast(data, dtype):
+    """Convert `data` to `dtype`, but raise rather than overflow when narrowing integers"""
+    data = np.asarray(data)
+    if dtype is None or data.dtype == dtype:
+        return data
+
+    dtype = np.dtype(dtype)
+    if dtype.kind in "iu" and data.size > 0:
+        info = np.iinfo(dtype)
+        if np.min(data) < info.min or np.max(data) > info.max:
+            raise OverflowError(f"The channel data doesn't fit in `{dtype}`. Use a larger data "
+                                f"type for this kind of channel.")
+    return data.astype(dtype)
+
+
+def reduce_precise(reduce, data, axis):
+    """Reduce `data` along `axis` while summing single-precision floats in double precision
+
+    The result has the data type of the input for `np.sum` and `np.mean` of floats.
+    """
+    if reduce in (np.sum, np.mean) and data.dtype.kind == "f" and data.dtype.itemsize < 8:
+        return reduce(data, axis=axis, dtype=np.float64).astype(data.dtype)
+    return reduce(data, axis=axis)
@@ -0,0 +1,166 @@
+import collections
+import os
+import h5py
+
+def _file_state(filename):
+    """Changes when the file is modified or replaced"""
+    stat = os.stat(filename)
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+PoolInfo = collections.namedtuple("PoolInfo", ["hits", "misses", "evictions", "open", "max_open"])
+
+
+class HandlePool:
+    """A bounded pool of read-only `h5py.File` handles, shared by everything that reads a file
+
+    Once more than `max_open` files are open, the least recently used ones are closed. This
+    invalidates all `h5py` objects of those files, so users of the pool keep the file name
+    instead of the handle, and acquire the handle again each time they need it. Closing a file
+    also frees the memory of its HDF5 chunk cache. Files are closed as well once the last
+    `File` object which retained them goes away.
+
+    Parameters
+    ----------
+    max_open : int
+        The maximum number of files which are open at the same time.
+    """
+    def __init__(self, max_open):
+        self.max_open = max_open
+        self._handles = collections.OrderedDict()  # absolute file name -> h5py.File
+        self._guids = {}  # of the open files
+        self._states = {}  # the size, modification time, etc. of the open files
+        self._users = collections.Counter()  # the number of `File` objects per file
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def acquire(self, filename, guid=None, refresh=False):
+        """Return the open handle of `filename` or (re)open it
+
+        Parameters
+        ----------
+        filename : str
+        guid : Optional[str]
+            If given, the file must still have this GUID, i.e. it's the same export.
+        refresh : bool
+            Reopen the file if it was modified or replaced since it was opened, e.g. because
+            it was exported again to the same path.
+        """
+        filename = os.path.abspath(filename)
+        h5file = self._handles.get(filename)
+        if h5file is not None and refresh and self._states[filename] != _file_state(filename):
+            self.close(filename)
+            h5file = None
+
+        if h5file is not None and h5file.id.valid:
+            self._handles.move_to_end(filename)
+            self._hits += 1
+        else:
+            self._misses += 1
+            h5file = h5py.File(filename, "r")
+            self._handles.pop(filename, None)  # it may have been closed by someone else
+            self._handles[filename] = h5file
+            self._guids[filename] = h5file.attrs.get("GUID")
+            self._states[filename] = _file_state(filename)
+            self._shrink(self.max_open)
+
+        if guid is not None and self._guids[filename] != guid:
+            raise RuntimeError(f"The file '{filename}' has changed since it was first opened: "
+                               f"its GUID doesn't match")
+        return h5file
+
+    def retain(self, filename):
+        """Register a user of `filename`, e.g. a `File`, which calls `release()` when it's done"""
+        self._users[os.path.abspath(filename)] += 1
+
+    def release(self, filename):
+        """Unregister a user of `filename` and close the file if it was the last one"""
+        filename = os.path.abspath(filename)
+        self._users[filename] -= 1
+        if self._users[filename] <= 0:
+            del self._users[filename]
+            self.close(filename)
+
+    def touch(self, filename):
+        """Mark `filename` as recently used if it's open, without opening it otherwise"""
+        if filename in self._handles:
+            self._handles.move_to_end(filename)
+
+    def guid(self, filename):
+        """The GUID of `filename` if it's open in the pool, or else `None`"""
+        return self._guids.get(filename)
+
+    def state(self, filename):
+        """The size, modification time, etc. of `filename` when it was opened, or else `None`"""
+        return self._states.get(filename)
+
+    def close(self, filename):
+        """Close `filename` if it's open. It's reopened when it's acquired again."""
+        filename = os.path.abspath(filename)
+        h5file = self._handles.pop(filename, None)
+        self._guids.pop(filename, None)
+        self._states.pop(filename, None)
+        if h5file is not None and h5file.id.valid:
+            h5file.close()
+
+    def _shrink(self, max_open):
+        while len(self._handles) > max_open:
+            filename, h5file = self._handles.popitem(last=False)
+            del self._guids[filename], self._states[filename]
+            if h5file.id.valid:
+                h5file.close()
+            self._evictions += 1
+
+    def resize(self, max_open):
+        """Change `max_open`, closing the least recently used files if there are too many"""
+        if max_open < 1:
+            raise ValueError("At least one file must be allowed to be open")
+        self.max_open = max_open
+        self._shrink(max_open)
+
+    def info(self):
+        """Hit and miss statistics and the number of open files"""
+        open_files = sum(h5file.id.valid for h5file in self._handles.values())
+        return PoolInfo(self._hits, self._misses, self._evictions, open_files, self.max_open)
+
+
+handle_pool = HandlePool(max_open=128)
+
+
+def set_max_open_files(max_open):
+    """Set the maximum number of Bluelake files which are kept open at the same time
+
+    Files are opened when they're first used and stay open so they can be read quickly. Past
+    the maximum, the least recently used files are closed. Nothing changes for `File` objects,
+    channel slices, kymographs, etc. of a closed file: the file is reopened as soon as they
+    need data from it. Lower this to stay within the operating system's limit of open files,
+    e.g. when working with thousands of files in one process. The default is 128.
+
+    Parameters
+    ----------
+    max_open : int
+
+    Examples
+    --------
+    ::
+
+        from lumicks import pylake
+
+        pylake.set_max_open_files(32)
+        collection = pylake.FileCollection("experiments/2020-01-21")
+    """
+    handle_pool.resize(max_open)
+
+
+def open_files_info():
+    """Statistics of the pool of open files, see :func:`set_max_open_files`
+
+    Returns
+    -------
+    PoolInfo
+        A named tuple of the number of `hits` (the file was still open), `misses` (it had to be
+        opened) and `evictions` (a file was closed to stay within the maximum), and the number of
+        `open` files and `max_open`.
+    """
+    return handle_pool.info()
@@ -1,6 +1,7 @@
 import enum
 import math
 import numpy as np
+from .dtypes import reduce_precise
 
 
 class ImageMetadata:
@@ -149,7 +150,7 @@ def reconstruct_image(data, infowave, pixels_per_line, lines_per_frame=None, red
     data = data[valid_idx]
     data.resize(round_up(data.size, pixel_size))
 
-    pixels = reduce(data.reshape(-1, pixel_size), axis=1)
+    pixels = reduce_precise(reduce, data.reshape(-1, pixel_size), axis=1)
 
     if lines_per_frame is None:
         pixels.resize(round_up(pixels.size, pixels_per_line))
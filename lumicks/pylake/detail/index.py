@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import re
+import h5py
+from ..channel import channel_class, TimeSeries, TimeTags
+
+_version = 1  # increment when the layout of the index changes
+_item_groups = ["Kymograph", "Scan", "Point Scan", "FD Curve", "Marker"]
+
+
+def index_directory():
+    """The directory of persistent indices: `$PYLAKE_CACHE_DIR` or the user's cache directory"""
+    if "PYLAKE_CACHE_DIR" in os.environ:
+        return os.environ["PYLAKE_CACHE_DIR"]
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or \
+        os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "lumicks", "pylake", "index")
+
+
+def _sidecar_path(h5file):
+    """The index file of `h5file` or `None` if it has no GUID to key it with"""
+    guid = re.sub(r"[^\w-]", "", str(h5file.attrs.get("GUID", "")))
+    return os.path.join(index_directory(), f"{guid}.json") if guid else None
+
+
+def _path_record(filename):
+    """The file which remembers the index of the file at `filename` for as long as it's unchanged"""
+    digest = hashlib.sha1(os.path.abspath(filename).encode()).hexdigest()
+    return os.path.join(index_directory(), "paths", f"{digest}.json")
+
+
+def _file_state(filename):
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _write_json(path, content):
+    """Write `content` to `path` such that readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(content, f)
+    os.replace(temporary, path)
+
+
+def _export_time(h5file):
+    export_time = h5file.attrs.get("Export time (ns)")
+    return None if export_time is None else int(export_time)
+
+
+def _channel_info(dset):
+    """Kind, time range, sample rate, length and data type of a timeline channel"""
+    cls = channel_class(dset)
+    info = {"kind": cls.__name__, "length": int(dset.shape[0]), "start": None, "stop": None,
+            "sample_rate": None, "dtype": str(dset.dtype)}
+    if cls is TimeSeries:
+        info["dtype"] = str(dset.dtype["Value"])
+        if info["length"]:
+            info["start"] = int(dset[0]["Timestamp"])
+            info["stop"] = int(dset[info["length"] - 1]["Timestamp"]) + 1
+    elif cls is TimeTags:
+        if info["length"]:
+            info["start"], info["stop"] = int(dset[0]), int(dset[info["length"] - 1]) + 1
+    else:
+        info["sample_rate"] = float(dset.attrs["Sample rate (Hz)"])
+        info["start"] = int(dset.attrs["Start time (ns)"])
+        info["stop"] = info["start"] + info["length"] * int(1e9 / info["sample_rate"])
+    return info
+
+
+def _item_info(dset):
+    """Time range and parsed JSON content of a timeline item, e.g. a kymograph"""
+    try:
+        content = json.loads(dset[()])
+    except (TypeError, ValueError):
+        content = None
+    return {"start": int(dset.attrs.get("Start time (ns)", 0)),
+            "stop": int(dset.attrs.get("Stop time (ns)", 0)), "json": content}
+
+
+def build_index(h5file):
+    """Describe all channels and timeline items of a Bluelake HDF5 file
+
+    The channels are found by visiting the whole file once. Strings, e.g. the JSON content of
+    timeline items and calibrations, aren't channels.
+
+    Returns
+    -------
+    dict
+        "channels" maps the path of each channel, e.g. "Force HF/Force 1x", to its "kind",
+        "start", "stop", "sample_rate", "length" and "dtype". "items" maps the timeline item
+        groups, e.g. "Kymograph", to a dict of each item's "start", "stop" and parsed "json".
+    """
+    channels = {}
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Dataset) and obj.ndim == 1 and obj.dtype.kind not in "OSU" \
+                and name.split("/")[0] not in _item_groups:
+            try:
+                channels[name] = _channel_info(obj)
+            except (KeyError, RuntimeError):
+                pass  # not a timeline channel, e.g. missing attributes or an unknown kind
+
+    h5file.visititems(visit)
+    items = {group: {name: _item_info(dset) for name, dset in h5file[group].items()}
+             for group in _item_groups if group in h5file}
+    return {"version": _version, "export_time": _export_time(h5file), "channels": channels,
+            "items": items}
+
+
+def load_index(h5file):
+    """Load the index of `h5file` from its sidecar file, or build and try to save it
+
+    The sidecar is keyed by the GUID of the file, so reopening the file, or a copy of it, skips
+    walking its contents. The path of the file is remembered as well, see `find_index()`. Files
+    without a GUID aren't persisted and unwritable cache directories are ignored.
+    """
+    path = _sidecar_path(h5file)
+    index = None
+    if path and os.path.exists(path):
+        try:
+            with open(path) as f:
+                index = json.load(f)
+            if (index.get("version"), index.get("export_time")) != (_version,
+                                                                     _export_time(h5file)):
+                index = None
+        except (OSError, ValueError):
+            index = None
+
+    if index is None:
+        index = build_index(h5file)
+        if path:
+            try:
+                _write_json(path, index)
+            except OSError:
+                return index
+
+    if path:
+        _remember_path(h5file.filename, path)
+    return index
+
+
+def _remember_path(filename, sidecar):
+    """Record that `filename` is indexed in `sidecar`, unless that's already known"""
+    try:
+        record = {"state": _file_state(filename), "index": sidecar}
+        path = _path_record(filename)
+        if os.path.exists(path):
+            with open(path) as f:
+                if json.load(f) == record:
+                    return
+        _write_json(path, record)
+    except (OSError, ValueError):
+        pass
+
+
+def find_index(filename):
+    """The saved index of the file at `filename` without opening it, or `None`
+
+    This only finds files which were indexed before by `load_index()` and haven't been
+    modified or replaced since, i.e. which have the same size and modification time.
+    """
+    try:
+        with open(_path_record(filename)) as f:
+            record = json.load(f)
+        if record["state"] != _file_state(filename):
+            return None
+        with open(record["index"]) as f:
+            index = json.load(f)
+    except (OSError, ValueError, KeyError):
+        return None
+    return index if index.get("version") == _version else None
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+def _reduceat(ufunc, data, starts, stops, dtype=None):
+    """Reduce each of the non-empty index ranges `[starts, stops)` of `data` using `ufunc.reduceat`"""
+    result = np.empty(starts.size, dtype=dtype or data.dtype)
+
+    # `reduceat` reduces from each index up to the next one. With interleaved starts and stops,
+    # the reductions of our ranges end up at the even positions of the output.
+    inner = stops < data.size
+    if np.any(inner):
+        bounds = np.stack((starts[inner], stops[inner]), axis=1).ravel()
+        result[inner] = ufunc.reduceat(data, bounds, dtype=dtype)[::2]
+
+    # `data.size` is not a valid `reduceat` index. Ranges which run up to the end are suffixes,
+    # so we reduce between their unique starts and accumulate those parts from the back.
+    tail = ~inner
+    if np.any(tail):
+        tail_starts, inverse = np.unique(starts[tail], return_inverse=True)
+        parts = ufunc.reduceat(data, tail_starts, dtype=dtype)
+        result[tail] = ufunc.accumulate(parts[::-1], dtype=dtype)[::-1][inverse.ravel()]
+
+    return result
+
+
+def _sum(data, starts, stops, counts):
+    return _reduceat(np.add, data, starts, stops, dtype=np.float64)
+
+
+def _mean(data, starts, stops, counts):
+    return _sum(data, starts, stops, counts) / counts
+
+
+def _std(data, starts, stops, counts):
+    # Shifting by the global mean avoids catastrophic cancellation in `E[x^2] - E[x]^2`
+    shifted = data - np.mean(data)
+    mean = _mean(shifted, starts, stops, counts)
+    variance = _mean(shifted**2, starts, stops, counts) - mean**2
+    return np.sqrt(np.maximum(variance, 0))
+
+
+def _min(data, starts, stops, counts):
+    return _reduceat(np.minimum, data, starts, stops)
+
+
+def _max(data, starts, stops, counts):
+    return _reduceat(np.maximum, data, starts, stops)
+
+
+_kernels = {
+    np.sum: _sum,
+    np.mean: _mean,
+    np.std: _std,
+    np.min: _min,
+    np.amin: _min,
+    np.max: _max,
+    np.amax: _max,
+}
+
+
+def has_kernel(reduce):
+    """Is there a vectorized implementation of the `reduce` function for `reduce_ranges()`?"""
+    return reduce in _kernels
+
+
+def reduce_ranges(data, starts, stops, reduce):
+    """Reduce many index ranges of `data` in a single vectorized pass
+
+    Parameters
+    ----------
+    data : np.ndarray
+        One-dimensional data.
+    starts, stops : np.ndarray
+        Index bounds of the half-open ranges `[start, stop)` which should be reduced. The ranges
+        may overlap and don't need to be sorted.
+    reduce : callable
+        One of `np.mean`, `np.sum`, `np.std`, `np.min` or `np.max`, see `has_kernel()`.
+
+    Returns
+    -------
+    np.ndarray
+        The `float64` reduction of each range. Empty ranges sum to zero and are `nan` otherwise.
+    """
+    starts, stops = (np.asarray(x, dtype=np.intp) for x in (starts, stops))
+    counts = stops - starts
+    nonempty = counts > 0
+
+    result = np.zeros(starts.size) if reduce is np.sum else np.full(starts.size, np.nan)
+    if np.any(nonempty):
+        result[nonempty] = _kernels[reduce](data, starts[nonempty], stops[nonempty],
+                                            counts[nonempty])
+    return result
@@ -0,0 +1,113 @@
+import heapq
+import numpy as np
+
+
+def _window_bounds(size, window, first, last):
+    """Bounds of the centered windows of positions `[first, last)`, clipped to `[0, size)`"""
+    lo = np.arange(first, last) - window // 2
+    return np.clip(lo, 0, size), np.clip(lo + window, 0, size)
+
+
+def _sum(data, window, first, last):
+    # Shifting by the mean keeps the cumulative sum small, which limits the round-off error
+    shift = np.mean(data)
+    cumulative = np.concatenate(([0], np.cumsum(data - shift)))
+    lo, hi = _window_bounds(data.size, window, first, last)
+    return cumulative[hi] - cumulative[lo] + shift * (hi - lo)
+
+
+def _mean(data, window, first, last):
+    lo, hi = _window_bounds(data.size, window, first, last)
+    return _sum(data, window, first, last) / (hi - lo)
+
+
+def _running_medians(data):
+    """The medians of the growing prefixes `data[:k + 1]`, like `np.median`, in O(n log n)"""
+    lower, upper = [], []  # heaps of the lower (negated) and upper half
+    medians = np.empty(data.size)
+    for k, value in enumerate(data.tolist()):
+        if lower and value > -lower[0]:
+            heapq.heappush(upper, value)
+        else:
+            heapq.heappush(lower, -value)
+        # Keep the halves balanced, with the middle value of an odd count in the lower half
+        if len(lower) > len(upper) + 1:
+            heapq.heappush(upper, -heapq.heappop(lower))
+        elif len(upper) > len(lower):
+            heapq.heappush(lower, -heapq.heappop(upper))
+        medians[k] = -lower[0] if len(lower) > len(upper) else (upper[0] - lower[0]) / 2
+    return medians
+
+
+def _median(data, window, first, last):
+    from scipy.ndimage import rank_filter
+
+    data = np.asarray(data, dtype=np.float64)
+    filtered = rank_filter(data, window // 2, window)
+    if window % 2 == 0:
+        # Like `np.median`, average the two middle values of even windows
+        filtered = (filtered + rank_filter(data, window // 2 - 1, window)) / 2
+    result = filtered[first:last]
+
+    # The windows which are cut off by the edges of the data are prefixes or suffixes of it,
+    # so their medians are found in a single pass from either edge
+    lo, hi = _window_bounds(data.size, window, first, last)
+    cut_off = hi - lo < window
+    prefixes = np.flatnonzero(cut_off & (lo == 0))
+    if prefixes.size > 0:
+        result[prefixes] = _running_medians(data[:hi[prefixes].max()])[hi[prefixes] - 1]
+    suffixes = np.flatnonzero(cut_off & (lo > 0))
+    if suffixes.size > 0:
+        reverse = data[lo[suffixes].min():][::-1]
+        result[suffixes] = _running_medians(reverse)[data.size - lo[suffixes] - 1]
+    return result
+
+
+def _min(data, window, first, last):
+    from scipy.ndimage import minimum_filter1d
+    # Repeating the edge values doesn't change the minima of the cut off windows
+    return minimum_filter1d(data, window, mode="nearest")[first:last]
+
+
+def _max(data, window, first, last):
+    from scipy.ndimage import maximum_filter1d
+    return maximum_filter1d(data, window, mode="nearest")[first:last]
+
+
+_kernels = {
+    np.sum: _sum,
+    np.mean: _mean,
+    np.median: _median,
+    np.min: _min,
+    np.amin: _min,
+    np.max: _max,
+    np.amax: _max,
+}
+
+
+def has_rolling_kernel(reduce):
+    """Is there a sliding window implementation of the `reduce` function for `rolling()`?"""
+    return reduce in _kernels
+
+
+def rolling(data, window, reduce, first=0, last=None):
+    """Reduce the centered sliding windows of `data`
+
+    The window of position `i` covers `data[i - window // 2:i - window // 2 + window]`. Near the
+    edges, the windows are cut off and fewer samples are reduced.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        One-dimensional data.
+    window : int
+        The number of samples per window.
+    reduce : callable
+        One of `np.mean`, `np.sum`, `np.median`, `np.min` or `np.max`. The mean and sum take
+        constant time per sample using a cumulative sum.
+    first, last : int
+        Only compute the positions `[first, last)`. The windows may still extend outside this
+        range. Defaults to the entire data.
+    """
+    last = data.size if last is None else last
+    return _kernels[reduce](data, window, first, last)
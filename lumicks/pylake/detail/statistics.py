@@ -0,0 +1,127 @@
+import numpy as np
+
+
+class RunningMoments:
+    """Count, sum, mean, variance and extrema of data which is processed in chunks
+
+    Chunks are reduced with numpy and merged using Chan et al.'s pairwise update, which is
+    numerically stable even for long channels with a large offset.
+    """
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.mean = np.nan
+        self._m2 = 0.0  # sum of squared differences from the mean
+        self.min = np.nan
+        self.max = np.nan
+
+    def update(self, data):
+        """Add the samples in `data`"""
+        data = np.asarray(data)
+        if data.size == 0:
+            return
+
+        other = RunningMoments()
+        other.count = data.size
+        other.sum = np.sum(data, dtype=np.float64)
+        other.mean = other.sum / other.count
+        other._m2 = np.sum((data - other.mean)**2)
+        other.min, other.max = np.min(data), np.max(data)
+        self.merge(other)
+
+    def merge(self, other):
+        """Combine the moments of `other` into these"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def var(self, ddof=0):
+        """The variance with `ddof` delta degrees of freedom, like :func:`numpy.var`"""
+        return self._m2 / (self.count - ddof) if self.count > ddof else np.nan
+
+
+class QuantileSketch:
+    """A mergeable sketch for approximate quantiles of data which is processed in chunks
+
+    This is a KLL sketch (Karnin, Lang & Liberty, 2016). It holds a hierarchy of compactors where
+    each item at level `h` represents `2**h` samples. Full compactors are sorted and every other
+    item is promoted to the next level. Memory use depends only on `k`, while the rank error is
+    typically within a few times `1 / k`.
+
+    Parameters
+    ----------
+    k : int
+        Accuracy parameter: the capacity of the highest compactor.
+    seed : Optional[int]
+        Seed for the random choice of the items which are promoted.
+    """
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.count = 0
+        self._compactors = [np.empty(0)]
+        self._random = np.random.RandomState(seed)
+
+    def _capacity(self, level):
+        depth = len(self._compactors) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3)**depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self._compactors):
+            items = self._compactors[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self._compactors):
+                    self._compactors.append(np.empty(0))
+                items = np.sort(items)
+                leftover = items.size % 2
+                promoted = items[leftover + self._random.randint(2)::2]
+                self._compactors[level] = items[:leftover]
+                self._compactors[level + 1] = np.concatenate((self._compactors[level + 1], promoted))
+            level += 1
+
+    def update(self, data):
+        """Add the samples in `data`"""
+        data = np.asarray(data, dtype=np.float64).ravel()
+        self._compactors[0] = np.concatenate((self._compactors[0], data))
+        self.count += data.size
+        self._compress()
+
+    def merge(self, other):
+        """Combine the samples of `other` into this sketch"""
+        while len(self._compactors) < len(other._compactors):
+            self._compactors.append(np.empty(0))
+        for level, items in enumerate(other._compactors):
+            self._compactors[level] = np.concatenate((self._compactors[level], items))
+        self.count += other.count
+        self._compress()
+
+    def quantile(self, q):
+        """Approximate `q`-th quantile(s), with `0 <= q <= 1` like :func:`numpy.quantile`"""
+        q = np.asarray(q, dtype=np.float64)
+        if np.any(q < 0) or np.any(q > 1):
+            raise ValueError("Quantiles must be in the range [0, 1]")
+        if self.count == 0:
+            return np.full(q.shape, np.nan)[()]
+
+        items = np.concatenate(self._compactors)
+        weights = np.concatenate([np.full(c.size, 2.0**level)
+                                  for level, c in enumerate(self._compactors)])
+        order = np.argsort(items, kind="stable")
+        items, weights = items[order], weights[order]
+
+        # Each item stands for `weight` consecutive samples. Place it at the center of those and
+        # interpolate linearly, which gives the same result as `np.quantile` for exact sketches.
+        cumulative = np.cumsum(weights)
+        ranks = (cumulative - (weights + 1) / 2) / max(cumulative[-1] - 1, 1)
+        return np.interp(q, ranks, items)
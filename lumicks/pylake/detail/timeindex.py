@@ -1,6 +1,9 @@
+import operator
 import re
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
 
-__all__ = ["Timeindex", "to_timestamp"]
+__all__ = ["Timeindex", "to_timestamp", "AffineTimestamps"]
 
 # It's impossible to see, but this regex matches a floating point number and suffix
 regex_template = r"((?P<{suffix}>\d*\.?\d+)\s*{suffix})?"
@@ -76,3 +79,88 @@ def to_timestamp(value, first, after_last):
             return after_last + idx
     except TypeError:
         return value
+
+
+class AffineTimestamps(NDArrayOperatorsMixin):
+    """Evenly spaced timestamps `start + i * dt` which are computed on demand
+
+    Indexing, slicing, `len()` and `searchsorted()` are evaluated in closed form, as is adding
+    or subtracting a scalar. The full array is only materialized by `np.asarray()` or by other
+    arithmetic.
+
+    Parameters
+    ----------
+    start : int
+        The first timestamp.
+    dt : int
+        The (positive) delta between two timestamps.
+    size : int
+        The number of timestamps.
+    """
+    dtype = np.dtype(np.int64)
+    ndim = 1
+
+    def __init__(self, start, dt, size):
+        self.start = start
+        self.dt = dt
+        self.size = max(size, 0)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def shape(self):
+        return self.size,
+
+    def __repr__(self):
+        return f"AffineTimestamps(start={self.start}, dt={self.dt}, size={self.size})"
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(self.size)
+            return AffineTimestamps(self.start + start * self.dt, step * self.dt,
+                                    len(range(start, stop, step)))
+
+        try:
+            index = operator.index(item)
+        except TypeError:
+            index = np.asarray(item)
+            if index.dtype == bool:
+                index = np.flatnonzero(index)
+            index = np.where(index < 0, index + self.size, index).astype(np.int64)
+            if np.any(index < 0) or np.any(index >= self.size):
+                raise IndexError("Index out of range")
+            return self.start + index * self.dt
+
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("Index out of range")
+        return np.int64(self.start + index * self.dt)
+
+    def __array__(self, dtype=None, copy=None):
+        timestamps = self.start + self.dt * np.arange(self.size, dtype=np.int64)
+        return timestamps if dtype is None else timestamps.astype(dtype, copy=False)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method == "__call__" and not kwargs and len(inputs) == 2 \
+                and ufunc in (np.add, np.subtract):
+            a, b = inputs
+            if a is self and isinstance(b, (int, np.integer)):
+                offset = b if ufunc is np.add else -b
+                return AffineTimestamps(self.start + offset, self.dt, self.size)
+            if b is self and ufunc is np.add and isinstance(a, (int, np.integer)):
+                return AffineTimestamps(self.start + a, self.dt, self.size)
+
+        inputs = tuple(np.asarray(x) if isinstance(x, AffineTimestamps) else x for x in inputs)
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def searchsorted(self, v, side="left"):
+        """Find the indices where `v` should be inserted to maintain order, see
+        :func:`numpy.searchsorted`"""
+        offset = np.asarray(v) - self.start
+        if side == "left":
+            index = -(-offset // self.dt)
+        else:
+            index = offset // self.dt + 1
+        return np.clip(index, 0, self.size).astype(np.int64)
@@ -14,3 +14,17 @@ def first(iterable, condition=lambda x: True):
     """
 
     return next(x for x in iterable if condition(x))
+
+
+def import_pyarrow():
+    """Import the optional `pyarrow` package, including `pyarrow.parquet`
+
+    Raises an `ImportError` which explains how to install it if it's missing.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError("This requires the optional `pyarrow` package. Install it with "
+                          "`pip install lumicks.pylake[parquet]`.") from error
+    return pyarrow
@@ -0,0 +1,148 @@
+import numpy as np
+from .detail.ranges import reduce_ranges
+from .detail.timeindex import Timeindex
+
+__all__ = ["find_events", "event_dtype"]
+
+event_dtype = np.dtype([("start", np.int64), ("stop", np.int64),
+                        ("extremum_time", np.int64), ("extremum", np.float64)])
+
+_chunk_size = 2**20
+
+
+def _hysteresis(data, threshold, reset, initial):
+    """The on/off state of each sample: on at or above `threshold` and off below `reset`
+
+    In between the two levels, a sample keeps the state of the previous one, or `initial` for
+    the samples before the first one which crosses a level.
+    """
+    trigger = np.full(data.size, -1, dtype=np.int8)
+    trigger[data < reset] = 0
+    trigger[data >= threshold] = 1
+    last_trigger = np.maximum.accumulate(np.where(trigger >= 0, np.arange(data.size), -1))
+    return np.where(last_trigger >= 0, trigger[last_trigger], initial).astype(bool)
+
+
+def _range_maxima(data, starts, stops):
+    """The maximum of each of the disjoint and non-empty ranges `[starts, stops)` and the index
+    of its first occurrence"""
+    maxima = reduce_ranges(data, starts, stops, np.max)
+
+    # Label the samples with their range and look for the first sample equal to the maximum
+    edges = np.zeros(data.size + 1, dtype=np.int64)
+    np.add.at(edges, starts, 1)
+    np.add.at(edges, stops, -1)
+    inside = np.cumsum(edges[:-1]) > 0
+    labels = np.cumsum(np.bincount(starts, minlength=data.size)[:data.size]) - 1
+    candidates = np.flatnonzero(inside)
+    candidates = candidates[data[candidates] == maxima[labels[candidates]]]
+    _, first = np.unique(labels[candidates], return_index=True)
+    return maxima, candidates[first]
+
+
+def _close(event, stop):
+    """Array of a single `event` which lasts until `stop`"""
+    start, _, extremum_time, extremum = event
+    return np.array([(start, stop, extremum_time, extremum)], dtype=event_dtype)
+
+
+def find_events(channel, threshold, reset=None, direction="above", min_duration=0):
+    """Find the time ranges during which a channel crosses a threshold
+
+    An event starts at the first sample which reaches `threshold` and lasts until the first
+    sample which crosses back over `reset`. Using a `reset` level slightly on the other side of
+    the threshold (hysteresis) prevents noise from splitting one event into many short ones.
+
+    The channel is processed in chunks which are read one at a time, so long channels don't need
+    to fit in memory. Events which span multiple chunks are reported once.
+
+    Parameters
+    ----------
+    channel : Slice
+        Any channel slice, e.g. `file.force1x` or `file.red_photon_count`.
+    threshold : float
+        The level at which an event starts.
+    reset : Optional[float]
+        The level at which an event ends. Defaults to `threshold`.
+    direction : str
+        'above' finds events where the data is at or above `threshold` and `reset` <= `threshold`
+        'below' finds events where the data is at or below `threshold` and `reset` >= `threshold`
+    min_duration : Union[int, str]
+        Events which are shorter than this (in ns or as a time string) are dropped.
+
+    Returns
+    -------
+    np.ndarray
+        A structured array with the fields `start` and `stop`, the timestamps of the first
+        sample of the event and the first sample after it (or the end of the channel), and
+        `extremum_time` and `extremum`, the timestamp and value of the highest (or lowest for
+        'below') sample of the event.
+
+    Examples
+    --------
+    ::
+
+        from lumicks import pylake
+
+        file = pylake.File("example.h5")
+        events = pylake.find_events(file.force1x, threshold=20, reset=18, min_duration="10ms")
+        for start, stop, _, peak in events:
+            print(f"{(stop - start) / 1e6} ms, peak force {peak} pN")
+    """
+    if direction not in ("above", "below"):
+        raise ValueError("Invalid argument for direction. Valid options are above and below")
+    reset = threshold if reset is None else reset
+    sign = 1 if direction == "above" else -1
+    if sign * reset > sign * threshold:
+        raise ValueError(f"The reset level can't be {direction} the threshold")
+    if isinstance(min_duration, str):
+        min_duration = Timeindex(min_duration).total_ns
+
+    events = []
+    ongoing = None  # an event which is still going at the end of the previous chunk
+    for chunk in channel.iter_chunks(n_samples=_chunk_size):
+        data = sign * np.asarray(chunk.data, dtype=np.float64)
+        timestamps = np.asarray(chunk.timestamps)
+        state = _hysteresis(data, sign * threshold, sign * reset, ongoing is not None)
+        if ongoing is not None and not state[0]:
+            # The event of the previous chunk ended right at the boundary
+            events.append(_close(ongoing, timestamps[0]))
+            ongoing = None
+
+        previous = np.int8(ongoing is not None)  # the state before the first sample
+        changes = np.diff(np.concatenate(([previous], state.astype(np.int8))))
+        starts = np.flatnonzero(changes > 0)
+        stops = np.flatnonzero(changes < 0)
+        if ongoing is not None:
+            starts = np.concatenate(([0], starts))
+        if state[-1]:
+            stops = np.append(stops, data.size)
+        if starts.size == 0:
+            continue
+
+        maxima, extrema = _range_maxima(data, starts, stops)
+        chunk_events = np.empty(starts.size, dtype=event_dtype)
+        chunk_events["start"] = timestamps[starts]
+        chunk_events["stop"] = timestamps[np.minimum(stops, data.size - 1)]
+        chunk_events["extremum_time"] = timestamps[extrema]
+        chunk_events["extremum"] = sign * maxima
+        if ongoing is not None:
+            # The first event continues the one from the previous chunk
+            start, _, extremum_time, extremum = ongoing
+            chunk_events["start"][0] = start
+            if sign * extremum >= sign * chunk_events["extremum"][0]:
+                chunk_events["extremum_time"][0] = extremum_time
+                chunk_events["extremum"][0] = extremum
+
+        if state[-1]:
+            ongoing = chunk_events[-1].item()
+            chunk_events = chunk_events[:-1]
+        else:
+            ongoing = None
+        events.append(chunk_events)
+
+    if ongoing is not None:
+        events.append(_close(ongoing, channel._src.stop))
+
+    events = np.concatenate(events) if events else np.empty(0, dtype=event_dtype)
+    return events[events["stop"] - events["start"] >= min_duration]
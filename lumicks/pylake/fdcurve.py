@@ -45,6 +45,10 @@ class FDCurve(DownsampledFD):
         new_copy._distance_cache = None
         return new_copy
 
+    def __getstate__(self):
+        """Pickle without the cached channels. The file is pickled as a reference."""
+        return {**self.__dict__, "_force_cache": None, "_distance_cache": None}
+
     def __sub__(self, baseline):
         """Subtract FD curve `baseline` from `self`
 
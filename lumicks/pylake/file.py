@@ -1,10 +1,18 @@
 import h5py
 import numpy as np
+import os
+import weakref
 from typing import Dict
 
 from .calibration import ForceCalibration
 from .channel import Slice, Continuous, TimeSeries, TimeTags, channel_class
+from .channel import _record_batches, _same_timestamps
+from .detail.cache import DatasetCache, shared_cache
+from .detail.dtypes import default_dtypes, dtype_for, resolve_dtypes
+from .detail.handles import handle_pool
+from .detail.index import load_index
 from .detail.mixin import Force, DownsampledFD, PhotonCounts, PhotonTimeTags
+from .detail.utilities import import_pyarrow
 from .fdcurve import FDCurve
 from .group import Group
 from .kymo import Kymo
@@ -14,6 +22,12 @@ from .scan import Scan
 __all__ = ["File"]
 
 
+def _file_options(dtypes, cache_size, memmap):
+    """The data types, cache and memory map mode of a file, see `File`"""
+    dtypes = default_dtypes() if dtypes is None else resolve_dtypes(dtypes)
+    return dtypes, shared_cache if cache_size is None else DatasetCache(cache_size), memmap
+
+
 class File(Group, Force, DownsampledFD, PhotonCounts, PhotonTimeTags):
     """A convenient HDF5 file wrapper for reading data exported from Bluelake
 
@@ -21,6 +35,20 @@ class File(Group, Force, DownsampledFD, PhotonCounts, PhotonTimeTags):
     ----------
     filename : str
         The HDF5 file to open in read-only mode
+    dtypes : Union[str, Dict[str, np.dtype], None]
+        The data types in which channels are loaded. "compact" saves memory by loading forces
+        and distances as `float32` and photon counts as `uint16`. A dict can set the data type
+        of the channel kinds "force", "distance" and "photon_count" individually. "stored" keeps
+        the data types of the file. The default is set by :func:`set_default_dtypes`.
+    cache_size : Optional[int]
+        Repeatedly accessed channels, including those used by kymographs, scans and FD curves,
+        are cached after their second read as long as they fit. By default, all files share one
+        cache, whose budget is set by :func:`set_cache_size`. Alternatively, give this file a
+        cache of its own with a budget of `cache_size` bytes, or set it to 0 to disable caching.
+    memmap : bool
+        Map contiguous, uncompressed channels into memory instead of reading them. Accessing
+        their data doesn't copy it, and processes which open the same file share its memory.
+        Other channels, and channels which are converted to another data type, are read as usual.
 
     Examples
     --------
@@ -31,13 +59,45 @@ class File(Group, Force, DownsampledFD, PhotonCounts, PhotonTimeTags):
         file = pylake.File("example.h5")
         file.force1x.plot()
         file.kymos["name"].plot()
+
+        with pylake.File("example.h5") as file:
+            force = file.force1x.data
     """
 
     SUPPORTED_FILE_FORMAT_VERSIONS = [1, 2]
 
-    def __init__(self, filename):
-        super().__init__(h5py.File(filename, 'r'))
+    def __init__(self, filename, dtypes=None, cache_size=None, memmap=False):
+        super().__init__(None, *_file_options(dtypes, cache_size, memmap))
+        filename = os.path.abspath(filename)
+        # The file may have been exported again since another `File` of this path opened it
+        self._reference = filename, handle_pool.acquire(filename, refresh=True).attrs.get("GUID")
+        self._retain(filename)
         self._check_file_format()
+        self._cached_index = None
+        self._items = {}
+
+    def _retain(self, filename):
+        """Keep `filename` in the pool of open files until this object is closed or deleted"""
+        handle_pool.retain(filename)
+        self._release = weakref.finalize(self, handle_pool.release, filename)
+
+    def close(self):
+        """Close the file
+
+        It's also closed when the last `File` object of it is deleted. Channels, kymographs,
+        etc. of the file which are read after it was closed open it again.
+        """
+        if self._h5 is not None:
+            self._h5.close()
+        else:
+            self._release()
+            handle_pool.close(self._reference[0])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def _check_file_format(self):
         if "Bluelake version" not in self.h5.attrs:
@@ -49,13 +109,56 @@ class File(Group, Force, DownsampledFD, PhotonCounts, PhotonTimeTags):
             raise Exception(f"Unsupported Bluelake file format version {ff_version}")
 
     @classmethod
-    def from_h5py(cls, h5py_file):
+    def from_h5py(cls, h5py_file, dtypes=None, cache_size=None, memmap=False):
         """Directly load an existing `h5py.File`"""
         new_file = cls.__new__(cls)
-        new_file.h5 = h5py_file
+        Group.__init__(new_file, h5py_file, *_file_options(dtypes, cache_size, memmap))
         new_file._check_file_format()
+        new_file._cached_index = None
+        new_file._items = {}
         return new_file
 
+    def __getstate__(self):
+        """Pickle a reference to the file: its name, GUID and the options it was opened with"""
+        cache_size = None if self._cache is shared_cache else self._cache.max_size
+        return {"filename": self.h5.filename, "guid": self.h5.attrs.get("GUID"),
+                "dtypes": self._dtypes, "cache_size": cache_size, "memmap": self._memmap}
+
+    def __setstate__(self, state):
+        """The file is only reopened once it's used"""
+        Group.__init__(self, None, *_file_options(state["dtypes"], state["cache_size"],
+                                                  state["memmap"]))
+        self._reference = state["filename"], state["guid"]
+        self._retain(state["filename"])
+        self._cached_index = None
+        self._items = {}
+
+    @property
+    def h5(self) -> h5py.File:
+        """The underlying `h5py.File`, which is reopened if it was closed by the pool of open files
+
+        The handle of a file which was opened by name is shared with all other objects of that
+        file. Use it right away instead of keeping it, see :func:`set_max_open_files`.
+        """
+        if self._h5 is None:
+            return handle_pool.acquire(*self._reference)
+        return self._h5
+
+    def cache_info(self):
+        """Statistics of the channel data cache
+
+        Returns
+        -------
+        CacheInfo
+            A named tuple of the number of `hits`, `misses` and `evictions`, and the current
+            `size` and `max_size` of the cache in bytes.
+        """
+        return self._cache.info()
+
+    def clear_cache(self):
+        """Free the memory used by cached channel data, of all files if the cache is shared"""
+        self._cache.clear()
+
     @property
     def bluelake_version(self) -> str:
         """The version of Bluelake which exported this file"""
@@ -119,21 +222,82 @@ class File(Group, Force, DownsampledFD, PhotonCounts, PhotonTimeTags):
 
         return print_attributes(self.h5) + "\n" + print_group(self.h5)
 
+    def export_parquet(self, channels, path, row_group_duration="10s", delta_encoding=True):
+        """Export channels with the same timestamps to a Parquet file
+
+        The channels are streamed from this file and each time span of `row_group_duration`
+        is written as a Parquet row group, so the export doesn't need to fit in memory. The
+        file has an int64 "timestamp" column and one column per channel. Requires the optional
+        `pyarrow` package.
+
+        Parameters
+        ----------
+        channels : List[str]
+            The channels as paths in the HDF5 file, e.g. "Force HF/Force 1x". They become the
+            column names. Channels which have different timestamps must be exported separately
+            or resampled first, see :func:`align`.
+        path : str
+            The Parquet file to write.
+        row_group_duration : Union[int, str]
+            The time span of each row group in nanoseconds or as a time string.
+        delta_encoding : bool
+            Store the timestamps using delta encoding. Timestamps of continuous channels then
+            take up hardly any space.
+
+        Examples
+        --------
+        ::
+
+            from lumicks import pylake
+
+            file = pylake.File("example.h5")
+            file.export_parquet(["Force HF/Force 1x", "Force HF/Force 1y"], "force.parquet")
+        """
+        pa = import_pyarrow()
+        pq = pa.parquet
+
+        slices = [self[name] for name in channels]
+        if not all(_same_timestamps(slices[0], s) for s in slices[1:]):
+            raise ValueError("All channels must have the same timestamps")
+        names = [None if isinstance(s._src, TimeTags) else name
+                 for s, name in zip(slices, channels)]
+
+        options = {"column_encoding": {"timestamp": "DELTA_BINARY_PACKED"},
+                   "use_dictionary": [n for n in names if n]} if delta_encoding else {}
+        writer = None
+        try:
+            for batch in _record_batches(slices, names, duration=row_group_duration):
+                if writer is None:
+                    writer = pq.ParquetWriter(path, batch.schema, **options)
+                writer.write_table(pa.Table.from_batches([batch]), row_group_size=len(batch))
+            if writer is None:  # there are no samples, but the columns are still written
+                empty = {"timestamp": np.empty(0, dtype=np.int64)}
+                empty.update({n: np.asarray(s.data) for s, n in zip(slices, names) if n})
+                pq.write_table(pa.table(empty), path, **options)
+        finally:
+            if writer is not None:
+                writer.close()
+
     def _get_force(self, n, xy):
         force_group = self.h5["Force HF"][f"Force {n}{xy}"]
         calibration_data = ForceCalibration.from_dataset(self.h5, n, xy)
 
-        return Continuous.from_dataset(force_group, "Force (pN)", calibration_data)
+        return Continuous.from_dataset(force_group, "Force (pN)", calibration_data,
+                                       dtype_for(self._dtypes, "Force HF"), self._cache,
+                                       self._memmap)
 
     def _get_downsampled_force(self, n, xy):
         group = self.h5["Force LF"]
+        dtype = dtype_for(self._dtypes, "Force LF")
 
         def make(channel):
             if xy:
                 calibration_data = ForceCalibration.from_dataset(self.h5, n, xy)
-                return TimeSeries.from_dataset(group[channel], "Force (pN)", calibration_data)
+                return TimeSeries.from_dataset(group[channel], "Force (pN)", calibration_data,
+                                               dtype, self._cache, self._memmap)
             else:
-                return TimeSeries.from_dataset(group[channel], "Force (pN)")
+                return TimeSeries.from_dataset(group[channel], "Force (pN)", dtype=dtype,
+                                               cache=self._cache, memmap=self._memmap)
 
         if xy:  # An x or y component of the downsampled force is easy
             return make(f"Force {n}{xy}")
@@ -147,39 +311,65 @@ class File(Group, Force, DownsampledFD, PhotonCounts, PhotonTimeTags):
         # If it's completely missing, we can reconstruct it from the x and y components
         fx = make(f"Force {n}x")
         fy = make(f"Force {n}y")
-        return Slice(TimeSeries(np.sqrt(fx.data**2 + fy.data**2), fx.timestamps),
+        return Slice(np.hypot(fx, fy)._src,
                      labels={"title": f"Force LF/Force {n}", "y": "Force (pN)"})
 
     def _get_distance(self, n):
         return TimeSeries.from_dataset(self.h5["Distance"][f"Distance {n}"],
-                                       r"Distance ($\mu$m)")
+                                       r"Distance ($\mu$m)",
+                                       dtype=dtype_for(self._dtypes, "Distance"), cache=self._cache,
+                                       memmap=self._memmap)
 
     def _get_photon_count(self, name):
-        return Continuous.from_dataset(self.h5["Photon count"][name], "Photon count")
+        return Continuous.from_dataset(self.h5["Photon count"][name], "Photon count",
+                                       dtype=dtype_for(self._dtypes, "Photon count"),
+                                       cache=self._cache, memmap=self._memmap)
 
     def _get_photon_time_tags(self, name):
-        return TimeTags.from_dataset(self.h5["Photon Time Tags"][name], "Photon time tags")
+        return TimeTags.from_dataset(self.h5["Photon Time Tags"][name], "Photon time tags",
+                                     cache=self._cache, memmap=self._memmap)
+
+    @property
+    def channels(self) -> Dict[str, dict]:
+        """Metadata of all timeline channels without reading their data
+
+        Maps the path of each channel in the file, e.g. "Force HF/Force 1x", to a dict with its
+        "kind" ("Continuous", "TimeSeries" or "TimeTags"), "start" and "stop" timestamps,
+        "sample_rate" (`None` unless continuous), "length" and "dtype". The metadata is
+        collected once per file and saved in a small index file, keyed by the GUID of the file,
+        in the user's cache directory. Reopening the file loads it from there.
+        """
+        return self._index["channels"]
+
+    @property
+    def _index(self):
+        if self._cached_index is None:
+            self._cached_index = load_index(self.h5)
+        return self._cached_index
+
+    def _timeline_items(self, group, make):
+        """The timeline items in `group`, e.g. "Kymograph", which are made once from the index"""
+        if group not in self._items:
+            items = self._index["items"].get(group, {})
+            self._items[group] = {name: make(name, info) for name, info in items.items()}
+        return dict(self._items[group])
 
     @property
     def kymos(self) -> Dict[str, Kymo]:
-        if "Kymograph" not in self.h5:
-            return dict()
-        return {name: Kymo.from_dataset(dset, self) for name, dset in self.h5["Kymograph"].items()}
+        return self._timeline_items("Kymograph", lambda name, info: Kymo(
+            name, self, info["start"], info["stop"], info["json"]["value0"]))
 
     @property
     def point_scans(self) -> Dict[str, Scan]:
-        if "Point Scan" not in self.h5:
-            return dict()
-        return {name: PointScan(dset, self) for name, dset in self.h5["Point Scan"].items()}
+        return self._timeline_items("Point Scan", lambda name, info: PointScan(
+            name, self, info["start"], info["stop"], info["json"]["value0"]))
 
     @property
     def scans(self) -> Dict[str, Scan]:
-        if "Scan" not in self.h5:
-            return dict()
-        return {name: Scan.from_dataset(dset, self) for name, dset in self.h5["Scan"].items()}
+        return self._timeline_items("Scan", lambda name, info: Scan(
+            name, self, info["start"], info["stop"], info["json"]["value0"]))
 
     @property
     def fdcurves(self) -> Dict[str, FDCurve]:
-        if "FD Curve" not in self.h5:
-            return dict()
-        return {name: FDCurve.from_dset(dset, self) for name, dset in self.h5["FD Curve"].items()}
+        return self._timeline_items("FD Curve", lambda name, info: FDCurve(
+            self, info["start"], info["stop"], name))
@@ -1,5 +1,6 @@
 import h5py
 from .channel import channel_class
+from .detail.dtypes import dtype_for
 
 
 class Group:
@@ -10,17 +11,35 @@ class Group:
     h5 : h5py.Group
         The underlying h5py group object
     """
-    def __init__(self, h5py_group):
-        self.h5 = h5py_group
+    def __init__(self, h5py_group, dtypes=None, cache=None, memmap=False, parent_file=None):
+        self._h5 = h5py_group
+        self._dtypes = dtypes or {}
+        self._cache = cache
+        self._memmap = memmap
+        # The group is looked up again in its file if the pool of open files closed it
+        self._parent_file = parent_file
+        self._path = h5py_group.name if parent_file is not None else None
+
+    @property
+    def h5(self) -> h5py.Group:
+        if self._parent_file is not None and not self._h5.id.valid:
+            self._h5 = self._parent_file.h5[self._path]
+        return self._h5
 
     def __getitem__(self, item):
         """Return a subgroup or a bluelake timeline channel"""
         thing = self.h5[item]
         if type(thing) is h5py.Group:
-            return Group(thing)
+            parent_file = self if self._parent_file is None else self._parent_file
+            return Group(thing, self._dtypes, self._cache, self._memmap, parent_file)
         else:
             cls = channel_class(thing)
-            return cls.from_dataset(thing)
+            dtype = dtype_for(self._dtypes, thing.parent.name.strip("/"))
+            if dtype is None:
+                return cls.from_dataset(thing, cache=self._cache, memmap=self._memmap)
+            else:
+                return cls.from_dataset(thing, dtype=dtype, cache=self._cache,
+                                        memmap=self._memmap)
 
     def __iter__(self):
         return self.h5.__iter__()
@@ -36,6 +36,10 @@ class Kymo(PhotonCounts, ExcitationLaserPower):
         name = self.__class__.__name__
         return f"{name}(pixels={self.pixels_per_line})"
 
+    def __getstate__(self):
+        """Pickle without the reconstructed images. The file is pickled as a reference."""
+        return {**self.__dict__, "_cache": {}}
+
     def __getitem__(self, item):
         """All indexing is in timestamp units (ns)"""
         if not isinstance(item, slice):
@@ -47,8 +51,9 @@ class Kymo(PhotonCounts, ExcitationLaserPower):
         stop = self.stop if item.stop is None else item.stop
         start, stop = (to_timestamp(v, self.start, self.stop) for v in (start, stop))
 
-        timestamps = self.infowave.timestamps
-        line_timestamps = line_timestamps_image(timestamps, self.infowave.data, self.pixels_per_line)
+        infowave = self.infowave
+        timestamps = infowave._src.timestamps  # evenly spaced, so evaluated in closed form
+        line_timestamps = line_timestamps_image(timestamps, infowave.data, self.pixels_per_line)
         line_timestamps = np.append(line_timestamps, timestamps[-1])
 
         i_min = np.searchsorted(line_timestamps, start, side='left')
@@ -128,7 +133,8 @@ class Kymo(PhotonCounts, ExcitationLaserPower):
         for photon_count in photon_counts:
             if len(photon_count) == 0:
                 continue
-            return self._timestamps(photon_count.timestamps)
+            # Evenly spaced, so only the timestamps of valid samples are computed (in closed form)
+            return self._timestamps(photon_count._src.timestamps)
         raise RuntimeError("Can't get pixel timestamps if there are no pixels")
 
     def _plot(self, image, **kwargs):
@@ -9,18 +9,39 @@ class PointScan(PhotonCounts, ExcitationLaserPower):
 
     Parameters
     ----------
-    h5py_dset : h5py.Dataset
-        The original HDF5 dataset containing the point scan
+    name : str
+        The name of the point scan
     file : lumicks.pylake.File
         The parent file. Used to look up channel data.
+    start, stop : int
+        The time range of the point scan in nanoseconds since the epoch
+    json : dict
+        The point scan's JSON content, e.g. whether it recorded fluorescence or force
     """
-    def __init__(self, h5py_dset, file):
-        self.start = h5py_dset.attrs["Start time (ns)"]
-        self.stop = h5py_dset.attrs["Stop time (ns)"]
-        self.name = h5py_dset.name.split("/")[-1]
-        self.json = json.loads(h5py_dset.value)["value0"]
+    def __init__(self, name, file, start, stop, json):
+        self.start = start
+        self.stop = stop
+        self.name = name
+        self.json = json
         self.file = file
 
+    @classmethod
+    def from_dataset(cls, h5py_dset, file):
+        """Construct a point scan from its HDF5 dataset
+
+        Parameters
+        ----------
+        h5py_dset : h5py.Dataset
+            The original HDF5 dataset containing the point scan
+        file : lumicks.pylake.File
+            The parent file. Used to look up channel data.
+        """
+        start = h5py_dset.attrs["Start time (ns)"]
+        stop = h5py_dset.attrs["Stop time (ns)"]
+        name = h5py_dset.name.split("/")[-1]
+        json_data = json.loads(h5py_dset[()])["value0"]
+        return cls(name, file, start, stop, json_data)
+
     def _get_photon_count(self, name):
         return getattr(self.file, f"{name}_photon_count".lower())[self.start:self.stop]
 
@@ -0,0 +1,102 @@
+import numpy as np
+
+
+class PowerSpectrum:
+    """A power spectral density estimated using Welch's method
+
+    Attributes
+    ----------
+    frequency : np.ndarray
+        Frequencies (Hz) of the spectrum.
+    power : np.ndarray
+        One-sided power spectral density in units of the channel squared per Hz.
+    num_segments : int
+        The number of segments which were averaged.
+    """
+    def __init__(self, frequency, power, num_segments, labels=None):
+        self.frequency = frequency
+        self.power = power
+        self.num_segments = num_segments
+        self.labels = labels or {}
+
+    def plot(self, **kwargs):
+        """Plot the power spectrum on logarithmic axes
+
+        Parameters
+        ----------
+        **kwargs
+            Forwarded to :func:`matplotlib.pyplot.loglog`.
+        """
+        import matplotlib.pyplot as plt
+
+        plt.loglog(self.frequency[1:], self.power[1:], **kwargs)  # skip the zero frequency
+        plt.xlabel("Frequency (Hz)")
+        plt.ylabel(f"PSD ({self.labels.get('y', 'y')}$^2$/Hz)")
+        plt.title(self.labels.get("title", "title"))
+
+
+class WelchAverage:
+    """Accumulates the Welch average of data which arrives in consecutive chunks
+
+    Samples which don't complete a segment are kept until the next chunk arrives, so the
+    result doesn't depend on the chunk size and equals that of `scipy.signal.welch()` with its
+    default constant detrending and density scaling.
+
+    Parameters
+    ----------
+    sample_rate : float
+        Sample rate (Hz) of the data.
+    segment_length : int
+        Number of samples per segment.
+    window : Union[str, tuple, np.ndarray]
+        Window name or parameters, see :func:`scipy.signal.get_window`, or the window itself.
+    overlap : Optional[int]
+        Number of samples shared by consecutive segments. Defaults to half a segment.
+    """
+    def __init__(self, sample_rate, segment_length, window="hann", overlap=None):
+        from scipy.signal import get_window
+
+        overlap = segment_length // 2 if overlap is None else overlap
+        if not 0 <= overlap < segment_length:
+            raise ValueError("The overlap must be non-negative and shorter than a segment")
+
+        self.sample_rate = sample_rate
+        self.segment_length = segment_length
+        self.step = segment_length - overlap
+        if isinstance(window, np.ndarray):
+            self.window = window
+        else:
+            self.window = get_window(window, segment_length)
+        if self.window.shape != (segment_length,):
+            raise ValueError("The window must have the same length as a segment")
+
+        self.num_segments = 0
+        self._sum = np.zeros(segment_length // 2 + 1)
+        self._leftover = np.empty(0)
+
+    def update(self, data):
+        """Add the next chunk of consecutive samples"""
+        data = np.concatenate((self._leftover, np.asarray(data, dtype=np.float64)))
+        if data.size < self.segment_length:
+            self._leftover = data
+            return
+
+        num_segments = (data.size - self.segment_length) // self.step + 1
+        segments = np.lib.stride_tricks.as_strided(
+            data, shape=(num_segments, self.segment_length),
+            strides=(self.step * data.strides[0], data.strides[0]), writeable=False)
+        segments = (segments - segments.mean(axis=1, keepdims=True)) * self.window
+        self._sum += np.sum(np.abs(np.fft.rfft(segments, axis=1))**2, axis=0)
+        self.num_segments += segments.shape[0]
+        self._leftover = data[segments.shape[0] * self.step:]
+
+    def result(self, labels=None):
+        """The average of the segments so far as a `PowerSpectrum`"""
+        if self.num_segments == 0:
+            raise RuntimeError("The data is shorter than a single segment")
+
+        power = self._sum / (self.num_segments * self.sample_rate * np.sum(self.window**2))
+        # One-sided: fold the power of the negative frequencies into the positive ones
+        power[1:self.segment_length - self.segment_length // 2] *= 2
+        frequency = np.fft.rfftfreq(self.segment_length, 1 / self.sample_rate)
+        return PowerSpectrum(frequency, power, self.num_segments, labels)
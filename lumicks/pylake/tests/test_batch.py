@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from lumicks import pylake
+from .conftest import MockDataFile_v2
+
+
+def mean_force(file):
+    if len(file.force1x) == 0:
+        raise ValueError("No force")
+    return file.force1x.mean()
+
+
+def unpicklable(file):
+    return lambda: None
+
+
+@pytest.fixture
+def paths(tmpdir):
+    paths = []
+    for i in range(5):
+        mock_file = MockDataFile_v2(tmpdir.join(f"{i}.h5"))
+        mock_file.write_metadata()
+        if i != 3:
+            mock_file.make_continuous_channel("Force HF", "Force 1x", 1, 10, np.arange(5.0) + i)
+        mock_file.file.close()
+        paths.append(str(tmpdir.join(f"{i}.h5")))
+    return paths + [str(tmpdir.join("missing.h5"))]
+
+
+@pytest.mark.parametrize("workers, chunksize", [(0, 1), (2, 1), (2, 4)])
+def test_map(paths, workers, chunksize):
+    results = list(pylake.batch.map(mean_force, paths, workers=workers, chunksize=chunksize))
+    assert [r.path for r in results] == paths
+    assert [r.value for r in results] == [2, 3, 4, None, 6, None]
+    assert isinstance(results[3].error, ValueError)
+    assert "No force" in results[3].traceback
+    assert isinstance(results[5].error, OSError)
+    assert all(r.error is None for r in results[:3])
+
+
+def test_map_unordered(paths):
+    results = list(pylake.batch.map(mean_force, paths, workers=2, ordered=False))
+    assert sorted(r.path for r in results) == sorted(paths)
+    assert {r.path: r.value for r in results}[paths[4]] == 6
+
+    # Results which can't be sent back from a worker are reported as errors
+    results = list(pylake.batch.map(unpicklable, paths[:2], workers=1))
+    assert all(r.error is not None and r.value is None for r in results)
+
+    with pytest.raises(ValueError):
+        list(pylake.batch.map(mean_force, paths, chunksize=0))
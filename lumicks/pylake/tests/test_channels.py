@@ -333,3 +333,494 @@ def test_downsampling():
         s.downsampled_by(-1)
     with pytest.raises(TypeError):
         s.downsampled_by(1.5)
+
+
+def test_continuous_lazy_loading(h5_file):
+    force = channel.Continuous.from_dataset(h5_file["Force HF"]["Force 1x"])
+    sliced = force[11:41]
+    assert sliced._src._cached_data is None
+    assert len(sliced) == 3
+    np.testing.assert_equal(sliced.data, [1, 2, 3])
+    np.testing.assert_equal(sliced.timestamps, [11, 21, 31])
+
+    nested = sliced[21:]
+    assert nested._src._cached_data is None
+    np.testing.assert_equal(nested.data, [2, 3])
+    assert len(force[100:200].data) == 0
+    assert len(force[:-100].data) == 0
+
+
+def test_timeseries_lazy_loading(h5_file):
+    force = channel.TimeSeries.from_dataset(h5_file["Force LF"]["Force 1x"])
+    assert force._src.start == 1
+    assert force._src.stop == 3
+    assert force._src._cached_timestamps is None
+
+    sliced = force[2:]
+    assert sliced._src._cached_data is None
+    np.testing.assert_equal(sliced.timestamps, [2])
+    np.testing.assert_equal(sliced.data, [2.1])
+    assert len(force[10:].data) == 0
+
+    # Values and timestamps are read together when neither has been loaded yet
+    force = channel.TimeSeries.from_dataset(h5_file["Force LF"]["Force 1x"])
+    np.testing.assert_equal(force.data, [1.1, 2.1])
+    assert force._src._cached_timestamps is not None
+    np.testing.assert_equal(force.timestamps, [1, 2])
+
+
+def test_sorted_slicing_returns_views():
+    data = np.arange(10.0)
+    s = channel.Slice(channel.TimeSeries(data, np.arange(10, 110, 10)))
+    sliced = s[25:65]
+    np.testing.assert_equal(sliced.data, [2, 3, 4, 5])
+    np.testing.assert_equal(sliced.timestamps, [30, 40, 50, 60])
+    assert np.shares_memory(sliced.data, data)
+    assert sliced._src.is_sorted
+
+    tags = np.arange(10, 100, 10, dtype=np.int64)
+    s = channel.Slice(channel.TimeTags(tags))
+    sliced = s[25:65]
+    np.testing.assert_equal(sliced.data, [30, 40, 50, 60])
+    assert np.shares_memory(sliced.data, tags)
+    assert len(s[65:25].data) == 0
+
+
+def test_unsorted_slicing():
+    s = channel.Slice(channel.TimeSeries([1, 2, 3, 4, 5], [50, 10, 40, 20, 30]))
+    assert not s._src.is_sorted
+    np.testing.assert_equal(s[20:45].data, [3, 4, 5])
+    np.testing.assert_equal(s[20:45].timestamps, [40, 20, 30])
+
+    s = channel.Slice(channel.TimeTags([50, 10, 40, 20, 30]))
+    assert not s._src.is_sorted
+    np.testing.assert_equal(s[20:45].data, [40, 20, 30])
+
+
+def test_downsampled_over_vectorized():
+    np.random.seed(1337)
+    data = np.random.rand(100)
+    continuous = channel.Slice(channel.Continuous(data, start=100, dt=10))
+    timeseries = channel.Slice(channel.TimeSeries(data, np.arange(100, 1100, 10)))
+    tags = channel.Slice(channel.TimeTags(np.arange(100, 1100, 10)))
+
+    # Overlapping, unsorted and empty ranges, as well as ranges running up to (and past) the end
+    ranges = np.array([[100, 150], [120, 500], [95, 300], [900, 1100], [940, 2000], [455, 456],
+                       [1000, 1100], [800, 1040]])
+    for s in (continuous, timeseries, tags):
+        for reduce in (np.mean, np.sum, np.std, np.min, np.max):
+            result = s.downsampled_over(ranges, reduce=reduce)
+            for (start, stop), value in zip(ranges, result.data):
+                subset = s[start:stop].data
+                if len(subset) > 0:
+                    np.testing.assert_allclose(value, reduce(subset))
+                elif reduce is np.sum:
+                    assert value == 0
+                else:
+                    assert np.isnan(value)
+
+        np.testing.assert_equal(s.downsampled_over(ranges).timestamps, ranges.sum(axis=1) // 2)
+        np.testing.assert_equal(s.downsampled_over(ranges.tolist(), where="left").timestamps,
+                                ranges[:, 0])
+
+    # Arbitrary callables are evaluated range by range
+    result = continuous.downsampled_over([(100, 150), (120, 500)], reduce=np.median)
+    np.testing.assert_allclose(result.data, [np.median(data[:5]), np.median(data[2:40])])
+
+    with pytest.raises(AssertionError):
+        continuous.downsampled_over(np.arange(10))
+
+
+def test_timetags_binning():
+    s = channel.Slice(channel.TimeTags([10, 11, 25, 26, 27, 48, 49], start=10, stop=60))
+    binned = s.binned(10)
+    np.testing.assert_equal(binned.data, [2, 3, 0, 2, 0])
+    np.testing.assert_equal(binned.timestamps, [10, 20, 30, 40, 50])
+    assert binned.sample_rate == 1e8
+
+    # Chunked counting gives the same result
+    np.testing.assert_equal(s._src.binned(20, chunk_size=3).data, [5, 2, 0])
+    np.testing.assert_equal(s[20:45].binned(10).data, [3, 0, 0])
+    np.testing.assert_equal(s.binned("20ns").data, [5, 2, 0])
+    assert len(channel.Slice(channel.TimeTags([])).binned(10)) == 0
+
+    with pytest.raises(ValueError):
+        s.binned(0)
+    with pytest.raises(NotImplementedError):
+        channel.Slice(channel.Continuous([1, 2, 3], start=0, dt=1)).binned(10)
+
+
+def test_timetags_lazy_loading(h5_file):
+    if "Photon Time Tags" in h5_file:
+        tags = channel.TimeTags.from_dataset(h5_file["Photon Time Tags"]["Red"])
+        sliced = tags[25:65]
+        assert sliced._src._cached_data is None
+        np.testing.assert_equal(sliced.data, [30, 40, 50, 60])
+        np.testing.assert_equal(tags.binned(20).data, [2, 2, 2, 2, 1])
+
+
+def test_downsampled_to():
+    # Irregular timestamps with a gap between 30 and 70 ns
+    s = channel.Slice(channel.TimeSeries([1.0, 2.0, 3.0, 4.0, 5.0, 6.0], [10, 12, 19, 25, 71, 72]))
+    frequency = 1e8  # 10 ns windows
+
+    d = s.downsampled_to(frequency)
+    np.testing.assert_allclose(d.data, [2, 4, 5.5])
+    np.testing.assert_equal(d.timestamps, [15, 25, 75])
+    np.testing.assert_equal(s.downsampled_to(frequency, where="left").timestamps, [10, 20, 70])
+    np.testing.assert_allclose(s.downsampled_to(frequency, reduce=np.sum).data, [6, 4, 11])
+    np.testing.assert_allclose(s.downsampled_to(frequency, reduce=np.median).data, [2, 4, 5.5])
+
+    # Continuous channels work as well
+    s = channel.Slice(channel.Continuous(np.arange(10.0), start=0, dt=5))
+    np.testing.assert_allclose(s.downsampled_to(frequency, reduce=np.max).data, [1, 3, 5, 7, 9])
+
+    # Unsorted timestamps are sorted first
+    s = channel.Slice(channel.TimeSeries([3.0, 1.0, 2.0], [25, 10, 12]))
+    np.testing.assert_allclose(s.downsampled_to(frequency).data, [1.5, 3])
+
+    # Windows are aligned to multiples of their length, so channels which start at different
+    # times share their timestamps
+    force = channel.Slice(channel.TimeSeries(np.arange(6.0), [13, 17, 24, 31, 38, 44]))
+    distance = channel.Slice(channel.Continuous(np.arange(8.0), start=21, dt=3))
+    np.testing.assert_equal(force.downsampled_to(frequency).timestamps, [15, 25, 35, 45])
+    np.testing.assert_equal(distance.downsampled_to(frequency).timestamps, [25, 35, 45])
+    np.testing.assert_allclose(distance.downsampled_to(frequency).data, [1, 4.5, 7])
+
+    assert len(channel.empty_slice.downsampled_to(frequency)) == 0
+    with pytest.raises(ValueError):
+        s.downsampled_to(frequency, where="up")
+    with pytest.raises(ValueError):
+        s.downsampled_to(-1)
+
+
+def test_iter_chunks():
+    data = np.arange(10.0)
+    sources = [channel.Continuous(data, start=100, dt=10),
+               channel.TimeSeries(data, np.arange(100, 200, 10)),
+               channel.TimeTags(np.arange(100, 200, 10))]
+    for src in sources:
+        s = channel.Slice(src, labels={"y": "y"})
+        chunks = list(s.iter_chunks(n_samples=4))
+        assert [len(c) for c in chunks] == [4, 4, 2]
+        assert all(c.labels == s.labels for c in chunks)
+        np.testing.assert_equal(np.concatenate([c.timestamps for c in chunks]), s.timestamps)
+
+        chunks = list(s.iter_chunks(n_samples=3, overlap=1))
+        np.testing.assert_equal([c.timestamps[0] for c in chunks], [100, 120, 140, 160, 180])
+        assert [len(c) for c in chunks] == [3, 3, 3, 3, 2]
+
+        chunks = list(s.iter_chunks(duration=40))
+        assert [len(c) for c in chunks] == [4, 4, 2]
+        chunks = list(s.iter_chunks(duration="40ns", overlap="20ns"))
+        np.testing.assert_equal([c.timestamps[0] for c in chunks], [100, 120, 140, 160, 180])
+
+    # Time tag chunks tile the time range
+    chunks = list(channel.Slice(sources[2]).iter_chunks(n_samples=4))
+    assert [(c._src.start, c._src.stop) for c in chunks] == [(100, 140), (140, 180), (180, 191)]
+
+    assert list(channel.empty_slice.iter_chunks(n_samples=4)) == []
+    with pytest.raises(ValueError):
+        next(channel.Slice(sources[0]).iter_chunks())
+    with pytest.raises(ValueError):
+        next(channel.Slice(sources[0]).iter_chunks(n_samples=4, duration=40))
+    with pytest.raises(ValueError):
+        next(channel.Slice(sources[0]).iter_chunks(n_samples=4, overlap=4))
+
+
+def test_iter_chunks_aligned_to_hdf5_chunks(tmpdir):
+    import h5py
+
+    with h5py.File(tmpdir.join("chunked.h5"), "w") as f:
+        dset = f.create_dataset("data", data=np.arange(100.0), chunks=(8,))
+        dset.attrs["Start time (ns)"] = 0
+        dset.attrs["Sample rate (Hz)"] = 1e9
+
+        s = channel.Continuous.from_dataset(dset)[3:95]  # starts at index 3 in the dataset
+        chunks = list(s.iter_chunks(n_samples=10))
+        assert all(c._src._cached_data is None for c in chunks)
+        assert [c.timestamps[0] % 8 for c in chunks[1:]] == [0] * (len(chunks) - 1)
+        assert [len(c) for c in chunks] == [13] + [16] * 4 + [15]
+        np.testing.assert_equal(np.concatenate([c.data for c in chunks]), np.arange(3.0, 95.0))
+
+
+def test_plot_envelope():
+    import matplotlib.pyplot as plt
+
+    data = np.random.rand(1000000)
+    s = channel.Slice(channel.Continuous(data, start=0, dt=1000))["100ms":"900ms"]
+    plt.figure()
+    s.plot()
+    line = plt.gca().lines[0]
+    assert len(line.get_xdata()) < 0.01 * len(s)
+    assert np.min(line.get_ydata()) == np.min(s.data)
+    assert np.max(line.get_ydata()) == np.max(s.data)
+
+    # Zooming in shows more detail, but never the data outside of the slice
+    plt.xlim(0, 0.0002)
+    x, y = line.get_data()
+    assert 0 <= np.min(x) and np.max(x) < 0.00021
+    np.testing.assert_equal(y[:4], np.repeat(data[100000:100002], 2))
+    plt.close()
+
+
+def test_envelope_pyramid_per_range(tmpdir):
+    import h5py
+    from lumicks.pylake.detail.cache import DatasetCache
+
+    with h5py.File(tmpdir.join("pyramid.h5"), "w") as f:
+        dset = f.create_dataset("data", data=np.random.rand(100000))
+        dset.attrs["Start time (ns)"] = 0
+        dset.attrs["Sample rate (Hz)"] = 1e9
+        cache = DatasetCache(0)
+
+        # The pyramid of a slice only covers the slice, not the whole channel
+        s = channel.Continuous.from_dataset(dset, cache=cache)[1000:21000]
+        centers, minima, maxima = s._src.envelope(0, len(s), 10)
+        assert len(s._src.pyramid) == 20000
+        assert np.min(minima) == np.min(s.data) and np.max(maxima) == np.max(s.data)
+
+        # It's reused when the channel is accessed again and by its slices once it's built
+        again = channel.Continuous.from_dataset(dset, cache=cache)[1000:21000]
+        assert again._src.pyramid is s._src.pyramid
+        assert s[5000:6000]._src.pyramid is s._src.pyramid
+        np.testing.assert_equal(s[5000:6000]._src.envelope(0, 1000, 10)[1],
+                                again[5000:6000]._src.envelope(0, 1000, 10)[1])
+        whole = channel.Continuous.from_dataset(dset, cache=cache)
+        assert whole._src.pyramid is not s._src.pyramid
+        assert len(whole._src.pyramid) == 100000
+
+
+def test_streaming_reductions(monkeypatch):
+    monkeypatch.setattr(channel, "_stream_chunk_size", 7)
+    data = np.random.rand(100)
+    s = channel.Slice(channel.Continuous(data, start=0, dt=10))
+
+    assert s.count() == 100
+    np.testing.assert_allclose(s.sum(), np.sum(data))
+    np.testing.assert_allclose(s.mean(), np.mean(data))
+    np.testing.assert_allclose(s.var(), np.var(data))
+    np.testing.assert_allclose(s.std(ddof=1), np.std(data, ddof=1))
+    assert s.min() == np.min(data)
+    assert s.max() == np.max(data)
+    np.testing.assert_allclose(s.quantile([0.1, 0.5]), np.quantile(data, [0.1, 0.5]))
+    np.testing.assert_allclose(s.percentile(90), np.percentile(data, 90))
+
+    timeseries = channel.Slice(channel.TimeSeries(np.array([4.0, 1, 2]), np.array([1, 2, 3])))
+    assert timeseries[2:].mean() == 1.5
+
+    empty = channel.Slice(channel.Empty())
+    assert empty.count() == 0 and empty.sum() == 0
+    assert np.isnan(empty.mean()) and np.isnan(empty.max()) and np.isnan(empty.quantile(0.5))
+
+
+def test_arithmetic(monkeypatch):
+    monkeypatch.setattr(channel, "_expression_chunk_size", 4)
+    x = np.arange(10.0)
+    y = np.random.rand(10)
+    a = channel.Slice(channel.Continuous(x, start=0, dt=10), labels={"title": "a", "y": "F"})
+    b = channel.Slice(channel.Continuous(y, start=0, dt=10))
+
+    result = np.sqrt(a**2 + b**2)
+    assert isinstance(result._src, channel.Expression)
+    assert result.labels == {"y": "F"}
+    np.testing.assert_allclose(result.data, np.sqrt(x**2 + y**2))
+    np.testing.assert_equal(result.timestamps, a.timestamps)
+    np.testing.assert_allclose((2 - a / 2).data, 2 - x / 2)
+    np.testing.assert_allclose((-abs(a - b) * 3).data, -np.abs(x - y) * 3)
+    np.testing.assert_allclose((2**a + b).data, 2**x + y)
+
+    # Slicing and downsampling evaluate only the selected samples
+    sliced = (a - b)[20:60]
+    assert sliced._src._cached_data is None
+    np.testing.assert_allclose(sliced.data, (x - y)[2:6])
+    downsampled = (a * b).downsampled_by(3)
+    np.testing.assert_allclose(downsampled.data, (x * y)[:9].reshape(-1, 3).mean(axis=1))
+    np.testing.assert_equal(downsampled.timestamps, a.downsampled_by(3).timestamps)
+    assert result.sample_rate == a.sample_rate
+
+    ts = channel.Slice(channel.TimeSeries(np.array([1.0, 2, 3]), np.array([1, 5, 9])))
+    np.testing.assert_equal((ts * ts)[2:6].data, [4])
+    with pytest.raises(NotImplementedError):
+        (ts + 1).downsampled_by(2)
+
+    with pytest.raises(ValueError):
+        a + a[10:]
+    with pytest.raises(TypeError):
+        a + x
+
+
+def test_resampled_to(monkeypatch):
+    monkeypatch.setattr(channel, "_stream_chunk_size", 3)
+    ts = channel.Slice(channel.TimeSeries(np.array([0.0, 10, 30]), np.array([10, 20, 40])),
+                       labels={"y": "distance"})
+    target = np.array([5, 10, 14, 16, 25, 40, 45])
+
+    np.testing.assert_allclose(ts.resampled_to(target).data, [np.nan, 0, 4, 6, 15, 30, np.nan])
+    np.testing.assert_equal(ts.resampled_to(target, "nearest").data,
+                            [np.nan, 0, 0, 10, 10, 30, np.nan])
+    np.testing.assert_equal(ts.resampled_to(target, "previous").data,
+                            [np.nan, 0, 0, 0, 10, 30, np.nan])
+    np.testing.assert_equal(ts.resampled_to(target).timestamps, target)
+    assert ts.resampled_to(target).labels == {"y": "distance"}
+
+    # Onto a continuous time grid, with epoch timestamps which don't fit in a double
+    start = 1_580_000_000_000_000_000
+    cont = channel.Slice(channel.Continuous(np.arange(8.0), start=start + 5, dt=4))
+    ts = channel.Slice(channel.TimeSeries(np.array([0.0, 30]), np.array([start, start + 30])))
+    resampled, same = channel.align([ts, cont], cont)
+    assert isinstance(resampled._src, channel.Continuous)
+    np.testing.assert_equal(resampled.timestamps, cont.timestamps)
+    np.testing.assert_allclose(resampled.data, [5, 9, 13, 17, 21, 25, 29, np.nan])
+    np.testing.assert_equal(same.data, cont.data)
+
+    unsorted = channel.Slice(channel.TimeSeries(np.array([30.0, 0]), np.array([40, 10])))
+    np.testing.assert_allclose(unsorted.resampled_to([10, 25, 50]).data, [0, 15, np.nan])
+    assert np.all(np.isnan(channel.empty_slice.resampled_to([1, 2]).data))
+    with pytest.raises(ValueError):
+        ts.resampled_to(target, method="cubic")
+
+
+def test_psd(monkeypatch):
+    from scipy.signal import welch
+
+    monkeypatch.setattr(channel, "_stream_chunk_size", 1000)
+    data = np.random.normal(size=(2, 5000))
+    x, y = (channel.Slice(channel.Continuous(d, start=0, dt=10000), labels={"y": "F"})
+            for d in data)
+
+    spectrum = x.psd(256)
+    frequency, power = welch(data[0], fs=1e5, nperseg=256)
+    np.testing.assert_allclose(spectrum.frequency, frequency)
+    np.testing.assert_allclose(spectrum.power, power)
+    assert spectrum.num_segments == 38
+    assert spectrum.labels == {"y": "F"}
+
+    spectra = channel.psd([x, y], "2.55ms", window="boxcar", overlap=0)
+    for spectrum, d in zip(spectra, data):
+        np.testing.assert_allclose(spectrum.power, welch(d, fs=1e5, window="boxcar", nperseg=255,
+                                                         noverlap=0)[1], atol=1e-20)
+
+    with pytest.raises(ValueError):
+        channel.psd([x, y[:"10ms"]], 256)
+    with pytest.raises(NotImplementedError):
+        channel.Slice(channel.TimeSeries(np.arange(5.0), np.arange(5))).psd(2)
+    with pytest.raises(RuntimeError):
+        x[:"1ms"].psd(256)
+
+
+def test_psd_of_differently_chunked_datasets(tmpdir):
+    import h5py
+    from scipy.signal import welch
+
+    data = np.random.normal(size=(2, 10000))
+    with h5py.File(tmpdir.join("psd.h5"), "w") as f:
+        slices = []
+        for d, chunks in zip(data, (1000, 1536)):
+            dset = f.create_dataset(f"chunks {chunks}", data=d, chunks=(chunks,))
+            dset.attrs["Start time (ns)"] = 0
+            dset.attrs["Sample rate (Hz)"] = 1e5
+            slices.append(channel.Continuous.from_dataset(dset))
+
+        for spectrum, d in zip(channel.psd(slices, 256), data):
+            assert spectrum.num_segments == 77
+            np.testing.assert_allclose(spectrum.power, welch(d, fs=1e5, nperseg=256)[1])
+
+
+def test_rolling(monkeypatch):
+    monkeypatch.setattr(channel, "_expression_chunk_size", 7)
+    data = np.random.rand(50)
+    s = channel.Slice(channel.Continuous(data, start=0, dt=10), labels={"y": "F"})
+
+    def brute_force(window, reduce):
+        return [reduce(data[max(i - window // 2, 0):i - window // 2 + window]) for i in range(50)]
+
+    for reduce in (np.mean, np.sum, np.median, np.min, np.max):
+        for window in (5, 30, 75):  # windows are cut off by both edges if they're long
+            np.testing.assert_allclose(s.rolling(window, reduce).data, brute_force(window, reduce))
+    np.testing.assert_allclose(s.rolling("40ns", np.median).data, brute_force(4, np.median))
+
+    smooth = s.rolling(6)
+    assert isinstance(smooth._src, channel.Rolling)
+    assert smooth.labels == {"y": "F"}
+    np.testing.assert_equal(smooth.timestamps, s.timestamps)
+
+    # Windows of slices still include the samples just outside of the slice
+    sliced = smooth[100:200]
+    assert sliced._src._cached_data is None
+    np.testing.assert_allclose(sliced.data, brute_force(6, np.mean)[10:20])
+    np.testing.assert_allclose((smooth - s)[100:200].data, (brute_force(6, np.mean) - data)[10:20])
+    np.testing.assert_allclose(smooth.downsampled_by(5).data,
+                               np.mean(np.reshape(brute_force(6, np.mean), (-1, 5)), axis=1))
+
+    ts = channel.Slice(channel.TimeSeries(np.array([1.0, 3, 2]), np.array([1, 5, 9])))
+    np.testing.assert_equal(ts.rolling(2, np.max).data, [1, 3, 3])
+    with pytest.raises(ValueError):
+        ts.rolling("2ns")
+    with pytest.raises(ValueError):
+        s.rolling(3, reduce=np.std)
+    with pytest.raises(ValueError):
+        s.rolling(0)
+
+
+def test_slices():
+    data = np.arange(20.0)
+    s = channel.Slice(channel.Continuous(data, start=100, dt=10), labels={"y": "F"})
+    ranges = np.array([[100, 130], [125, 155], [300, 300], [280, 400]])
+    collection = s.slices(ranges)
+
+    assert len(collection) == 4
+    np.testing.assert_equal(collection.counts, [3, 3, 0, 2])
+    np.testing.assert_equal(collection.data[1], [3, 4, 5])
+    np.testing.assert_equal(collection.timestamps[3], [280, 290])
+    np.testing.assert_allclose(collection.reduce(np.sum), [3, 12, 0, 37])
+    np.testing.assert_allclose(collection.reduce(np.max), [2, 5, np.nan, 19])
+    np.testing.assert_allclose(collection.reduce(lambda x: np.sum(x)), [3, 12, 0, 37])
+
+    # All slices are views into the same buffer, which only covers the ranges
+    assert len(collection._parent) == 20
+    assert all(np.shares_memory(d, collection._parent.data) for d in collection.data if d.size)
+    second = collection[1]
+    assert isinstance(second, channel.Slice) and second.labels == {"y": "F"}
+    np.testing.assert_equal(second.timestamps, [130, 140, 150])
+    np.testing.assert_equal([len(c) for c in collection[1:3]], [3, 0])
+
+    unsorted = channel.Slice(channel.TimeSeries(np.array([3.0, 1, 2]), np.array([30, 10, 20])))
+    np.testing.assert_equal(unsorted.slices([[10, 25], [25, 40]]).reduce(np.sum), [3, 3])
+    assert len(s.slices(np.empty((0, 2)))) == 0
+    np.testing.assert_equal(channel.empty_slice.slices([[1, 2]]).reduce(np.sum), [0])
+
+    # Ranges after the last time tag are empty
+    tags = channel.Slice(channel.TimeTags(np.arange(10, 100, 10))).slices([[10, 30], [95, 200]])
+    assert [len(c) for c in tags] == [2, 0]
+    assert tags[1].data.size == 0
+
+
+def test_missing_pyarrow(monkeypatch):
+    import sys
+
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ImportError, match=r"pip install lumicks.pylake\[parquet\]"):
+        channel.Slice(channel.Continuous(np.arange(10.0), start=100, dt=10)).to_arrow()
+
+
+def test_to_arrow(monkeypatch):
+    pa = pytest.importorskip("pyarrow")
+    monkeypatch.setattr(channel, "_stream_chunk_size", 4)
+
+    data = np.arange(10.0)
+    table = channel.Slice(channel.Continuous(data, start=100, dt=10)).to_arrow()
+    assert table.column_names == ["timestamp", "value"]
+    assert table.schema.field("timestamp").type == pa.int64()
+    assert table.column("value").num_chunks == 3
+    np.testing.assert_equal(table.column("value").to_numpy(), data)
+    np.testing.assert_equal(table.column("timestamp").to_numpy(), np.arange(100, 200, 10))
+
+    time_series = channel.Slice(channel.TimeSeries(np.array([1, 2], dtype=np.uint16), [5, 15]))
+    table = time_series.to_arrow()
+    assert table.schema.field("value").type == pa.uint16()
+    assert table.to_pydict() == {"timestamp": [5, 15], "value": [1, 2]}
+
+    time_tags = channel.Slice(channel.TimeTags(np.arange(10, 100, 10)))
+    assert time_tags.to_arrow().column_names == ["timestamp"]
+    assert channel.empty_slice.to_arrow().num_rows == 0
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from lumicks import pylake
+from lumicks.pylake.channel import Continuous, Concatenated
+from .conftest import MockDataFile_v2
+
+
+@pytest.fixture
+def collection(tmpdir, monkeypatch):
+    monkeypatch.setenv("PYLAKE_CACHE_DIR", str(tmpdir.join("index")))
+
+    def make_file(name, start, force, distance=None, fdcurve=None):
+        mock_file = MockDataFile_v2(tmpdir.join(name))
+        mock_file.write_metadata()
+        mock_file.file.attrs["GUID"] = f"{tmpdir.basename}-{name}"
+        mock_file.make_continuous_channel("Force HF", "Force 1x", start, 10, force)
+        if distance:
+            mock_file.make_timeseries_channel("Distance", "Distance 1", distance)
+        if fdcurve:
+            dset = mock_file.make_json_data("FD Curve", fdcurve, "{}")
+            dset.attrs["Start time (ns)"] = start
+            dset.attrs["Stop time (ns)"] = start + 20
+        mock_file.file.close()
+
+    # The names aren't in chronological order
+    make_file("b.h5", 1000, np.arange(5.0, 10.0), [(1000, 1.0), (1030, 2.0)], fdcurve="2")
+    make_file("a.h5", 100, np.arange(5.0), fdcurve="1")
+    make_file("c.h5", 2000, np.arange(10.0, 12.0), [(2000, 3.0)])
+    return pylake.FileCollection(str(tmpdir))
+
+
+def test_concatenated_channels(collection):
+    assert len(collection) == 3
+    assert collection.time_ranges == [(100, 150), (1000, 1050), (2000, 2020)]
+
+    force = collection.force1x
+    np.testing.assert_equal(force.data, np.arange(12.0))
+    np.testing.assert_equal(force.timestamps[4:7], [140, 1000, 1010])
+    assert force.labels["title"] == "Force HF/Force 1x"
+
+    # Only the overlapping files are sliced
+    part = force[1020:2010]
+    assert isinstance(part._src, Concatenated) and len(part._src.sources) == 2
+    np.testing.assert_equal(part.data, [7, 8, 9, 10])
+    assert isinstance(force[1020:1040]._src, Continuous)
+    np.testing.assert_equal(force["900ns":"1s"].data, [5, 6, 7, 8, 9, 10, 11])
+    assert len(force[500:600]) == 0
+    np.testing.assert_equal(force.downsampled_by(2).data, [0.5, 2.5, 5.5, 7.5, 10.5])
+
+    # Files which don't overlap the range aren't read
+    distance = collection.distance1
+    np.testing.assert_equal(distance[1010:1040].data, [2])
+    assert distance._src.sources[1]._src is None
+
+    # Channels which are missing from some files
+    np.testing.assert_equal(collection.distance1.data, [1, 2, 3])
+    np.testing.assert_equal(collection["Distance/Distance 1"][1010:].timestamps, [1030, 2000])
+    assert len(collection.force2x) == 0
+    assert collection.force1x.calibration == []
+
+
+def test_open_only_overlapping_files(collection, tmpdir):
+    from lumicks.pylake.detail.handles import handle_pool
+
+    assert len(collection.files) == 3  # indexes all files
+    for path in collection.paths:
+        handle_pool.close(path)
+
+    opened = pylake.open_files_info().misses
+    collection = pylake.FileCollection(str(tmpdir))
+    assert collection.time_ranges == [(100, 150), (1000, 1050), (2000, 2020)]
+    force = collection.force1x
+    assert pylake.open_files_info().misses == opened
+    np.testing.assert_equal(force[1020:1040].data, [7, 8])
+    assert pylake.open_files_info().misses == opened + 1
+    assert force.labels["title"] == "Force HF/Force 1x"
+    assert pylake.open_files_info().misses == opened + 2
+
+    # A file which changed is indexed again
+    mock_file = MockDataFile_v2(tmpdir.join("c.h5"))
+    mock_file.write_metadata()
+    mock_file.make_continuous_channel("Force HF", "Force 1x", 3000, 10, np.arange(3.0))
+    mock_file.file.close()
+    collection = pylake.FileCollection(str(tmpdir))
+    assert collection.time_ranges[2] == (3000, 3030)
+
+
+def test_catalog(collection):
+    catalog = collection.catalog
+    assert [(entry.kind, entry.name, entry.start) for entry in catalog] == [("fdcurve", "1", 100),
+                                                                           ("fdcurve", "2", 1000)]
+    assert catalog[1].file is collection.files[1]
+    assert catalog[1].item.start == 1000
+
+
+def test_paths(collection, tmpdir):
+    single = pylake.FileCollection(str(tmpdir.join("b.h5")))
+    assert single.paths == [str(tmpdir.join("b.h5"))]
+    np.testing.assert_equal(single.force1x.data, np.arange(5.0, 10.0))
+    assert len(pylake.FileCollection(str(tmpdir), pattern="[ab].h5")) == 2
+    with pytest.raises(FileNotFoundError):
+        pylake.FileCollection(str(tmpdir.join("missing")))
@@ -0,0 +1,54 @@
+import numpy as np
+from lumicks.pylake.detail.decimation import MinMaxPyramid
+
+
+def brute_force_envelope(data, centers, start, stop):
+    """Reconstruct the edges of the consecutive bins from their centers and reduce the raw data"""
+    edges = [start]
+    for center in centers:
+        edges.append(int(2 * center + 1 - edges[-1]))
+    assert edges[-1] == stop
+    return ([data[a:b].min() for a, b in zip(edges[:-1], edges[1:])],
+            [data[a:b].max() for a, b in zip(edges[:-1], edges[1:])])
+
+
+def test_pyramid_levels():
+    data = np.random.rand(1000)
+    pyramid = MinMaxPyramid(data, block_size=8, factor=4)
+    assert [level[0].size for level in pyramid.levels] == [125, 32, 8, 2, 1]
+    np.testing.assert_equal(pyramid.levels[0][0], [data[i:i + 8].min() for i in range(0, 1000, 8)])
+    np.testing.assert_equal(pyramid.levels[1][1], [data[i:i + 32].max() for i in range(0, 1000, 32)])
+    assert pyramid.levels[-1][0] == data.min()
+    assert pyramid.levels[-1][1] == data.max()
+
+    # Building the pyramid in chunks gives the same result
+    chunked = MinMaxPyramid(data, block_size=8, factor=4)
+    for a, b in zip(chunked._build(chunk_blocks=3), pyramid.levels):
+        np.testing.assert_equal(a, b)
+
+    assert MinMaxPyramid(np.empty(0)).levels == []
+
+
+def test_pyramid_envelope():
+    np.random.seed(1)
+    data = np.random.rand(1000)
+    pyramid = MinMaxPyramid(data, block_size=8, factor=4)
+
+    for start, stop, num_bins in [(0, 1000, 10), (3, 997, 10), (101, 350, 5), (5, 60, 10),
+                                  (0, 1000, 1), (500, 520, 100)]:
+        centers, minima, maxima = pyramid.envelope(start, stop, num_bins)
+        assert num_bins <= len(centers) <= 4 * num_bins + 2 or len(centers) == stop - start
+        assert np.all(np.diff(centers) > 0)
+        assert start <= centers[0] and centers[-1] < stop
+        assert minima.min() == data[start:stop].min()
+        assert maxima.max() == data[start:stop].max()
+        expected_minima, expected_maxima = brute_force_envelope(data, centers, start, stop)
+        np.testing.assert_equal(minima, expected_minima)
+        np.testing.assert_equal(maxima, expected_maxima)
+
+    # Few samples: every sample is a bin
+    centers, minima, maxima = pyramid.envelope(10, 15, 100)
+    np.testing.assert_equal(centers, np.arange(10, 15))
+    np.testing.assert_equal(minima, data[10:15])
+
+    assert len(pyramid.envelope(1000, 2000, 10)[0]) == 0
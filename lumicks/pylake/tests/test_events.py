@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from lumicks.pylake import channel, events
+from lumicks.pylake.events import find_events
+
+
+def make_slice(data):
+    return channel.Slice(channel.Continuous(np.asarray(data, dtype=float), start=100, dt=10))
+
+
+def test_find_events():
+    s = make_slice([0, 5, 3, 6, 2, 0, 7, 9, 8, 1, 0, 6])
+    result = find_events(s, threshold=5, reset=3)
+    np.testing.assert_equal(result["start"], [110, 160, 210])
+    np.testing.assert_equal(result["stop"], [140, 190, 220])
+    np.testing.assert_equal(result["extremum"], [6, 9, 6])
+    np.testing.assert_equal(result["extremum_time"], [130, 170, 210])
+
+    # Without hysteresis, the dip to 3 splits the first event
+    np.testing.assert_equal(find_events(s, threshold=5)["start"], [110, 130, 160, 210])
+    np.testing.assert_equal(find_events(s, threshold=5, reset=3, min_duration=20)["start"], [110, 160])
+
+    below = find_events(s, threshold=0, reset=1, direction="below")
+    np.testing.assert_equal(below["start"], [100, 150, 200])
+    np.testing.assert_equal(below["stop"], [110, 160, 210])
+    np.testing.assert_equal(below["extremum"], [0, 0, 0])
+
+    assert find_events(channel.empty_slice, threshold=1).dtype == events.event_dtype
+    with pytest.raises(ValueError):
+        find_events(s, threshold=5, reset=6)
+    with pytest.raises(ValueError):
+        find_events(s, threshold=5, direction="up")
+
+
+def test_find_events_chunked(monkeypatch):
+    data = np.sin(np.arange(5000) / 50) + np.random.normal(scale=0.3, size=5000)
+    s = make_slice(data)
+    expected = find_events(s, threshold=0.5, reset=0)
+    assert expected.size > 10
+
+    monkeypatch.setattr(events, "_chunk_size", 7)
+    chunked = find_events(s, threshold=0.5, reset=0)
+    np.testing.assert_equal(chunked, expected)
+
+    for start, stop, extremum_time, extremum in chunked:
+        event = s[start:stop]
+        assert event.data[0] >= 0.5 and np.all(event.data >= 0)
+        assert extremum == np.max(event.data)
+        assert extremum_time == event.timestamps[np.argmax(event.data)]
@@ -1,7 +1,13 @@
+import h5py
 import numpy as np
+import os
+import pickle
+import shutil
 from lumicks import pylake
 import pytest
 from textwrap import dedent
+from lumicks.pylake.detail.handles import handle_pool
+from .conftest import MockDataFile_v2
 
 
 def test_scans(h5_file):
@@ -54,6 +60,298 @@ def test_channels(h5_file):
     assert f.downsampled_force1.labels["title"] == "Force LF/Force 1"
 
 
+def test_dtypes(h5_file):
+    f = pylake.File.from_h5py(h5_file, dtypes="compact")
+    assert f.force1x.data.dtype == np.float32
+    assert np.allclose(f.force1x.data, [0, 1, 2, 3, 4])
+    assert f.downsampled_force1x.data.dtype == np.float32
+    assert f.downsampled_force1x.timestamps.dtype == np.int64
+    assert np.allclose(f.downsampled_force1x.data, [1.1, 2.1])
+    assert f["Force HF"]["Force 1y"].data.dtype == np.float32
+    assert f.force1x.downsampled_by(2).data.dtype == np.float32
+
+    f = pylake.File.from_h5py(h5_file, dtypes={"force": np.float16})
+    assert f.force1x.data.dtype == np.float16
+
+    pylake.set_default_dtypes({"force": np.int8})
+    try:
+        assert pylake.File.from_h5py(h5_file).force1x.data.dtype == np.int8
+        assert pylake.File.from_h5py(h5_file, dtypes="stored").force1x.data.dtype == np.float64
+    finally:
+        pylake.set_default_dtypes(None)
+    assert pylake.File.from_h5py(h5_file).force1x.data.dtype == np.float64
+
+    from lumicks.pylake.detail.dtypes import cast
+    with pytest.raises(OverflowError):
+        cast(np.array([1.0, 300.0]), np.uint8)
+    with pytest.raises(OverflowError):
+        cast(np.array([-1, 2]), np.uint16)
+    with pytest.raises(ValueError):
+        pylake.File.from_h5py(h5_file, dtypes={"torque": np.float32})
+
+
+def test_cache(h5_file):
+    # Streaming reads don't fill the cache
+    f = pylake.File.from_h5py(h5_file, cache_size=1000)
+    f.force1x.mean()
+    assert f.cache_info().size == 0
+
+    # Data is only kept once it's read a second time
+    f = pylake.File.from_h5py(h5_file, cache_size=1000)
+    data = f.force1x.data
+    assert data.flags.writeable
+    assert (f.cache_info().misses, f.cache_info().size) == (1, 0)
+    assert np.all(f.force1x.data == data)
+    assert (f.cache_info().misses, f.cache_info().size) == (2, data.nbytes)
+    timestamps = f.force1x.timestamps
+    assert np.all(f["Force HF"]["Force 1x"][timestamps[1]:timestamps[3]].data == data[1:3])
+    assert f.force1x.mean() == np.mean(data)
+    assert f.cache_info().hits == 2
+
+    # Modifying the data doesn't change the cached data
+    data = f.force1x.data
+    data += 1
+    np.testing.assert_equal(f.force1x.data, data - 1)
+
+    f.clear_cache()
+    f.force1x.data
+    assert f.cache_info().size == 0
+
+    # Only one channel of 5 float64 samples fits, so the other one is evicted
+    f = pylake.File.from_h5py(h5_file, cache_size=50)
+    f.force1x.data, f.force1x.data, f.force1y.data, f.force1y.data
+    assert f.cache_info().evictions == 1
+    assert f.cache_info().size == 40
+
+    f = pylake.File.from_h5py(h5_file, cache_size=0)
+    f.force1x.data, f.force1x.data, f.force1x.data
+    assert f.cache_info().misses == 3
+
+    # By default, all files share one cache
+    f = pylake.File.from_h5py(h5_file)
+    assert f._cache is pylake.File.from_h5py(h5_file)._cache
+    max_size = f.cache_info().max_size
+    pylake.set_cache_size(0)
+    try:
+        assert f.cache_info().size == 0
+    finally:
+        pylake.set_cache_size(max_size)
+
+
+def test_memmap(tmpdir):
+    mock_file = MockDataFile_v2(tmpdir.join("memmap.h5"))
+    mock_file.write_metadata()
+    mock_file.make_continuous_channel("Force HF", "Force 1x", 1, 10, np.arange(5.0))
+    mock_file.make_timeseries_channel("Distance", "Distance 1", [(1, 1.1), (2, 2.1)])
+    mock_file.make_timetags_channel("Photon Time Tags", "Red", np.arange(10, 100, step=10))
+    mock_file.file.create_dataset("Photon count/Red", data=np.arange(8, dtype=np.uint32),
+                                  chunks=(4,), compression="gzip")
+    mock_file.file["Photon count/Red"].attrs.update({"Start time (ns)": 1, "Kind": "Continuous",
+                                                     "Sample rate (Hz)": 1e8})
+    mock_file.file.close()
+
+    f = pylake.File(str(tmpdir.join("memmap.h5")), memmap=True)
+    force = f.force1x
+    assert isinstance(force._src._src_data.mapped, np.memmap)
+    assert np.all(force[11:31].data == [1, 2])
+    assert np.shares_memory(force.data, force._src._src_data.mapped)
+    assert isinstance(f.distance1._src._src_data.mapped, np.memmap)
+    assert np.all(f.distance1.data == [1.1, 2.1])
+    assert np.all(f.distance1.timestamps == [1, 2])
+    assert isinstance(f.red_photon_time_tags._src._src_data.mapped, np.memmap)
+    assert np.all(f.red_photon_time_tags[20:50].data == [20, 30, 40])
+
+    # Compressed channels fall back to regular reads
+    assert f.red_photon_count._src._src_data.mapped is None
+    assert np.all(f.red_photon_count.data == np.arange(8))
+    f = pylake.File(str(tmpdir.join("memmap.h5")), dtypes="compact", memmap=True)
+    assert f.force1x.data.dtype == np.float32
+    assert np.all(f.force1x.data == np.arange(5))
+
+
+def test_export_parquet(tmpdir):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    mock_file = MockDataFile_v2(tmpdir.join("parquet.h5"))
+    mock_file.write_metadata()
+    mock_file.make_continuous_channel("Force HF", "Force 1x", 100, 10, np.arange(50.0))
+    mock_file.make_continuous_channel("Force HF", "Force 1y", 100, 10, np.arange(50.0, 100.0))
+    mock_file.make_timeseries_channel("Distance", "Distance 1", [(1, 1.5), (30, 2.5), (400, 3.5)])
+    mock_file.file.close()
+    f = pylake.File(str(tmpdir.join("parquet.h5")))
+
+    path = str(tmpdir.join("force.parquet"))
+    f.export_parquet(["Force HF/Force 1x", "Force HF/Force 1y"], path, row_group_duration=100)
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 5
+    assert "DELTA_BINARY_PACKED" in parquet_file.metadata.row_group(0).column(0).encodings
+    table = parquet_file.read()
+    assert table.column_names == ["timestamp", "Force HF/Force 1x", "Force HF/Force 1y"]
+    np.testing.assert_equal(table.column("timestamp").to_numpy(), np.arange(100, 600, 10))
+    np.testing.assert_equal(table.column("Force HF/Force 1y").to_numpy(), np.arange(50.0, 100))
+
+    # Time spans without samples don't produce empty row groups
+    path = str(tmpdir.join("distance.parquet"))
+    f.export_parquet(["Distance/Distance 1"], path, row_group_duration=100, delta_encoding=False)
+    assert pq.ParquetFile(path).metadata.num_row_groups == 2
+    assert pq.read_table(path).to_pydict() == {"timestamp": [1, 30, 400],
+                                               "Distance/Distance 1": [1.5, 2.5, 3.5]}
+
+    with pytest.raises(ValueError):
+        f.export_parquet(["Force HF/Force 1x", "Distance/Distance 1"], path)
+
+
+def test_index(h5_file, tmpdir, monkeypatch):
+    f = pylake.File.from_h5py(h5_file)
+    assert f.channels["Force HF/Force 1x"] == {"kind": "Continuous", "start": 1, "stop": 51,
+                                              "sample_rate": 1e8, "length": 5,
+                                              "dtype": "float64"}
+    assert f.channels["Force LF/Force 1y"] == {"kind": "TimeSeries", "start": 1, "stop": 3,
+                                              "sample_rate": None, "length": 2,
+                                              "dtype": "float64"}
+    if f.format_version == 2:
+        assert f.channels["Photon Time Tags/Red"]["start"] == 10
+        assert f.kymos["Kymo1"] is f.kymos["Kymo1"]
+        assert f.kymos["Kymo1"].json["fluorescence"]
+
+    monkeypatch.setenv("PYLAKE_CACHE_DIR", str(tmpdir))
+    mock_file = MockDataFile_v2(tmpdir.join("index.h5"))
+    mock_file.write_metadata()
+    mock_file.file.attrs["GUID"] = "{1A8024D2-C49B-48FF-B183-2FDF0065F26D}"
+    mock_file.make_continuous_channel("Force HF", "Force 1x", 1, 10, np.arange(5.0))
+    ds = mock_file.make_json_data("Point Scan", "PointScan1",
+                                  '{"value0": {"fluorescence": true, "force": false}}')
+    ds.attrs["Start time (ns)"] = 1
+    ds.attrs["Stop time (ns)"] = 51
+    mock_file.file.close()
+
+    channels = pylake.File(str(tmpdir.join("index.h5"))).channels
+    assert tmpdir.join("1A8024D2-C49B-48FF-B183-2FDF0065F26D.json").check()
+
+    # Reopening the file doesn't walk its contents again
+    from lumicks.pylake.detail import index
+    monkeypatch.setattr(index, "build_index", None)
+    f = pylake.File(str(tmpdir.join("index.h5")))
+    assert f.channels == channels
+
+    # Timeline items are made from the index without reading their datasets
+    monkeypatch.setattr(h5py.Dataset, "__getitem__", None)
+    point_scan = f.point_scans["PointScan1"]
+    assert (point_scan.start, point_scan.stop) == (1, 51)
+    assert point_scan.has_fluorescence and not point_scan.has_force
+
+
+def test_pickle(h5_file, tmpdir):
+    # Work on a copy, because the file of the fixture is still open for writing
+    h5_file.flush()
+    filename = str(tmpdir.join("pickle.h5"))
+    shutil.copy(h5_file.filename, filename)
+    f = pylake.File(filename, dtypes="compact")
+    f.force1x.data  # loaded data isn't pickled
+
+    for obj in (f, f.force1x, f.downsampled_force1, f.force1x["1ns":"30ns"] + 1):
+        unpickled = pickle.loads(pickle.dumps(obj))
+        if isinstance(obj, pylake.File):
+            assert unpickled.force1x.data.dtype == np.float32
+            np.testing.assert_equal(unpickled.force1x.data, f.force1x.data)
+        else:
+            assert unpickled.labels == obj.labels
+            np.testing.assert_equal(unpickled.data, obj.data)
+            np.testing.assert_equal(unpickled.timestamps, obj.timestamps)
+    assert len(pickle.dumps(f.force1x)) < 1000
+
+    if f.format_version == 2:
+        kymo = f.kymos["Kymo1"]
+        kymo.red_image
+        assert len(pickle.dumps(kymo)) < 10000
+        np.testing.assert_equal(pickle.loads(pickle.dumps(kymo)).red_image, kymo.red_image)
+        np.testing.assert_equal(pickle.loads(pickle.dumps(f.scans["Scan1"])).red_image,
+                                f.scans["Scan1"].red_image)
+
+    # The file is only reopened once it's used, and it must be the same export
+    filename = str(tmpdir.join("modified.h5"))
+    shutil.copy(h5_file.filename, filename)
+    f = pylake.File(filename)
+    pickled = pickle.dumps(f.force1x)
+    f.h5.close()
+    with h5py.File(filename, "r+") as h5:
+        h5.attrs["GUID"] = "another"
+    force = pickle.loads(pickled)
+    with pytest.raises(RuntimeError):
+        force.data
+
+
+def test_open_files(h5_file, tmpdir):
+    h5_file.flush()
+    filenames = [str(tmpdir.join(f"pool{i}.h5")) for i in range(3)]
+    for filename in filenames:
+        shutil.copy(h5_file.filename, filename)
+
+    max_open = pylake.open_files_info().max_open
+    pylake.set_max_open_files(2)
+    try:
+        files = [pylake.File(filename, cache_size=0) for filename in filenames]
+        info = pylake.open_files_info()
+        assert (info.open, info.max_open) == (2, 2)
+
+        # The first file was closed, but its channels and items reopen it
+        force = files[0].force1x
+        np.testing.assert_equal(force.data, files[2].force1x.data)
+        assert pylake.open_files_info().evictions == info.evictions + 1
+        assert pylake.open_files_info().misses == info.misses + 1
+        pylake.File(filenames[1])  # closes the first file again
+        np.testing.assert_equal(force["1ns":"30ns"].data, files[2].force1x["1ns":"30ns"].data)
+        if files[0].format_version == 2:
+            pylake.File(filenames[1])
+            np.testing.assert_equal(files[0].kymos["Kymo1"].red_image,
+                                    files[2].kymos["Kymo1"].red_image)
+        assert pylake.open_files_info().open == 2
+
+        # Groups look up their HDF5 group again once their file is reopened
+        group = files[0]["Force HF"]
+        pylake.set_max_open_files(1)
+        np.testing.assert_equal(files[2]["Force HF"]["Force 1x"].data, force.data)
+        np.testing.assert_equal(group["Force 1x"].data, force.data)
+        np.testing.assert_equal(files[0]["Force HF"]["Force 1x"].data, force.data)
+        assert list(group) == list(files[2]["Force HF"])
+
+        with pytest.raises(ValueError):
+            pylake.set_max_open_files(0)
+    finally:
+        pylake.set_max_open_files(max_open)
+
+
+def test_close_and_reexport(tmpdir):
+    filename = str(tmpdir.join("reexported.h5"))
+
+    def export(data):
+        mock_file = MockDataFile_v2(tmpdir.join("export.h5"))
+        mock_file.write_metadata()
+        mock_file.make_continuous_channel("Force HF", "Force 1x", 1, 10, data)
+        mock_file.file.close()
+        os.replace(str(tmpdir.join("export.h5")), filename)
+
+    export(np.arange(5.0))
+    first = pylake.File(filename)
+    np.testing.assert_equal(first.force1x.data, np.arange(5.0))
+    np.testing.assert_equal(first.force1x.data, np.arange(5.0))  # now it's cached
+
+    # The same path is exported again while the first file is still open
+    export(np.arange(10.0, 13.0))
+    with pylake.File(filename) as second:
+        np.testing.assert_equal(second.force1x.data, np.arange(10.0, 13.0))
+    assert filename not in [path for path in handle_pool._handles]
+
+    # Files are closed once the last `File` object is deleted
+    first = pylake.File(filename)
+    second = pylake.File(filename)
+    del first
+    assert second.h5.id.valid
+    open_files = pylake.open_files_info().open
+    del second
+    assert pylake.open_files_info().open == open_files - 1
+
+
 def test_calibration(h5_file):
     f = pylake.File.from_h5py(h5_file)
 
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from lumicks.pylake.detail.statistics import QuantileSketch, RunningMoments
+
+
+def test_running_moments():
+    data = np.random.normal(loc=1e9, size=1000)
+    moments = RunningMoments()
+    for chunk in np.array_split(data, 7):
+        moments.update(chunk)
+    moments.update(np.empty(0))
+
+    assert moments.count == 1000
+    np.testing.assert_allclose(moments.sum, np.sum(data))
+    np.testing.assert_allclose(moments.mean, np.mean(data))
+    np.testing.assert_allclose(moments.var(), np.var(data))
+    np.testing.assert_allclose(moments.var(ddof=1), np.var(data, ddof=1))
+    assert moments.min == np.min(data)
+    assert moments.max == np.max(data)
+
+    empty = RunningMoments()
+    assert empty.count == 0 and empty.sum == 0
+    assert np.isnan(empty.mean) and np.isnan(empty.var()) and np.isnan(empty.min)
+
+
+def test_quantile_sketch():
+    small = QuantileSketch()
+    small.update([3, 1, 2, 4])
+    np.testing.assert_allclose(small.quantile([0, 0.5, 1]), [1, 2.5, 4])
+
+    data = np.random.rand(100000)
+    first, second = QuantileSketch(seed=0), QuantileSketch(seed=1)
+    for chunk in np.array_split(data[:60000], 6):
+        first.update(chunk)
+    second.update(data[60000:])
+    first.merge(second)
+
+    assert first.count == data.size
+    assert sum(c.size for c in first._compactors) < 1000
+    q = np.linspace(0, 1, 21)
+    ranks = np.searchsorted(np.sort(data), first.quantile(q)) / data.size
+    np.testing.assert_allclose(ranks, q, atol=0.02)
+
+    assert np.isnan(QuantileSketch().quantile(0.5))
+    with pytest.raises(ValueError):
+        first.quantile(1.5)
@@ -1,7 +1,8 @@
+import numpy as np
 import pytest
 import re
 
-from lumicks.pylake.detail.timeindex import regex_template, regex, Timeindex
+from lumicks.pylake.detail.timeindex import regex_template, regex, Timeindex, AffineTimestamps
 
 
 def test_regex_template():
@@ -64,3 +65,36 @@ def test_timeindex():
 
     with pytest.raises(TypeError):
         Timeindex(1)
+
+
+def test_affine_timestamps():
+    t = AffineTimestamps(100, 10, 5)
+    reference = np.array([100, 110, 120, 130, 140])
+    assert len(t) == 5
+    assert t.shape == (5,)
+    np.testing.assert_equal(np.asarray(t), reference)
+    assert np.asarray(t).dtype == np.int64
+
+    assert t[0] == 100
+    assert t[-1] == 140
+    with pytest.raises(IndexError):
+        t[5]
+
+    assert isinstance(t[1:4], AffineTimestamps)
+    np.testing.assert_equal(np.asarray(t[1:4]), reference[1:4])
+    np.testing.assert_equal(np.asarray(t[::2]), reference[::2])
+    np.testing.assert_equal(np.asarray(t[4:1]), [])
+    np.testing.assert_equal(t[[0, 2, -1]], reference[[0, 2, -1]])
+    np.testing.assert_equal(t[reference > 115], reference[reference > 115])
+
+    for side in ("left", "right"):
+        values = [0, 100, 105, 110, 139, 140, 141, 1000]
+        np.testing.assert_equal(t.searchsorted(values, side=side),
+                                np.searchsorted(reference, values, side=side))
+
+    shifted = t - t[0]
+    assert isinstance(shifted, AffineTimestamps)
+    np.testing.assert_equal(np.asarray(shifted), reference - 100)
+    np.testing.assert_equal(np.asarray(5 + t), reference + 5)
+    np.testing.assert_allclose(t / 10, reference / 10)
+    np.testing.assert_equal(t > 115, reference > 115)
@@ -53,5 +53,6 @@ setup(
     python_requires='>=3.6',
     install_requires=['pytest>=3.5, <4.0', 'h5py>=2.9, <3.0', 'numpy>=1.14, <2',
                       'scipy>=1.1, <2', 'matplotlib>=2.2, <3', 'tifffile>=2018.11.6'],
+    extras_require={'parquet': ['pyarrow']},
     zip_safe=False,
 )